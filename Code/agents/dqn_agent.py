@@ -3,37 +3,104 @@ import torch.nn as nn
 import torch.optim as optim
 import random
 import numpy as np
-from collections import deque
+
+from agents.replay_buffer import ReplayBuffer
+from agents.prioritized_replay import PrioritizedReplayBuffer
+
+def configure_torch_threads(threads=None, workers=0):
+    # Hilos intra-op para el learner: por defecto los núcleos físicos (el valor inicial de torch)
+    # que no usan los workers de rollout. Los inter-op se fijan a 1 (redes pequeñas, sin
+    # paralelismo entre operadores que aprovechar).
+    if threads is None:
+        threads = max(1, torch.get_num_threads() - workers)
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass  # solo se puede fijar antes del primer trabajo paralelo
+    return threads
 
 class DQN(nn.Module):
-    def __init__(self, state_dim, action_dim):
+    def __init__(self, state_dim, action_dim, dueling=False):
         super(DQN, self).__init__()
-        self.layers = nn.Sequential(
-            nn.Linear(state_dim, 64),
-            nn.ReLU(),
-            nn.Linear(64, action_dim)
-        )
+        self.dueling = dueling
+        if dueling:
+            # Cabeza dueling: Q = V + A - media(A); layers queda como tronco compartido
+            self.layers = nn.Sequential(
+                nn.Linear(state_dim, 64),
+                nn.ReLU(),
+            )
+            self.value = nn.Linear(64, 1)
+            self.advantage = nn.Linear(64, action_dim)
+        else:
+            self.layers = nn.Sequential(
+                nn.Linear(state_dim, 64),
+                nn.ReLU(),
+                nn.Linear(64, action_dim)
+            )
 
     def forward(self, x):
+        if self.dueling:
+            h = self.layers(x)
+            advantage = self.advantage(h)
+            return self.value(h) + advantage - advantage.mean(dim=1, keepdim=True)
         return self.layers(x)
 
 class DQNAgent:
-    def __init__(self, state_dim, action_dim):
+    # target_update: "hard" copia la red en la target cada target_sync_every pasos de
+    # entrenamiento; "soft" la mezcla en cada paso (Polyak, target <- tau * red + (1 - tau) * target).
+    # double=True elige la acción siguiente con la red online y la evalúa con la target (Double DQN).
+    # Cada train_step hace updates_per_step actualizaciones de batch_size muestras; amp calcula la
+    # pasada en bfloat16 (autocast) y compile_loss compila la función de pérdida con torch.compile.
+    # inference_only: solo la red, sin memoria de repetición, target ni optimizador (copias de la
+    # política en workers y actores, que reciben los pesos ya entrenados)
+    def __init__(self, state_dim, action_dim, memory_size=10000, prioritized=False, seed=None,
+                 target_update="hard", target_sync_every=500, tau=0.005, double=True, dueling=False,
+                 batch_size=32, updates_per_step=1, amp=False, compile_loss=False, inference_only=False):
+        if target_update not in ("hard", "soft"):
+            raise ValueError("target_update must be 'hard' or 'soft'")
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-        self.model = DQN(state_dim, action_dim).to(self.device)
-        self.target_model = DQN(state_dim, action_dim).to(self.device)
-        self.memory = deque(maxlen=10000)
-        self.optimizer = optim.Adam(self.model.parameters(), lr=0.001)
+        self.state_dim = state_dim
+        self.action_dim = action_dim
+        self.inference_only = inference_only
+        self._build_models(dueling)
+        self.rng = random.Random(seed)
+        self.prioritized = prioritized
+        if inference_only:
+            self.memory = None
+        elif prioritized:
+            self.memory = PrioritizedReplayBuffer(memory_size, state_dim, self.device, seed=seed)
+        else:
+            self.memory = ReplayBuffer(memory_size, state_dim, self.device, seed=seed)
         self.gamma = 0.99
         self.epsilon = 0.1
-        self.batch_size = 32
+        self.batch_size = batch_size
+        self.updates_per_step = updates_per_step
+        self.amp = amp
+        self._loss = torch.compile(self._compute_loss) if compile_loss else self._compute_loss
+        self.target_update = target_update
+        self.target_sync_every = target_sync_every
+        self.tau = tau
+        self.double = double
+        self.train_steps = 0
+
+    def _build_models(self, dueling):
+        self.model = DQN(self.state_dim, self.action_dim, dueling=dueling).to(self.device)
+        if self.inference_only:
+            self.model.requires_grad_(False)
+            self.target_model = self.optimizer = None
+            return
+        self.target_model = DQN(self.state_dim, self.action_dim, dueling=dueling).to(self.device)
+        self.target_model.load_state_dict(self.model.state_dict())
+        self.target_model.requires_grad_(False)
+        self.optimizer = optim.Adam(self.model.parameters(), lr=0.001)
 
-    def remember(self, s, a, r, s_next):
-        self.memory.append((s, a, r, s_next))
+    def remember(self, s, a, r, s_next, done=False):
+        self.memory.add(s, a, r, s_next, done)
 
     def get_action(self, state):
-        if random.random() < self.epsilon:
-            return random.randint(0, 3)
+        if self.rng.random() < self.epsilon:
+            return self.rng.randint(0, 3)
         with torch.no_grad():
             state_tensor = torch.FloatTensor(state).unsqueeze(0).to(self.device)
             q_values = self.model(state_tensor)
@@ -42,27 +109,95 @@ class DQNAgent:
     def train_step(self):
         if len(self.memory) < self.batch_size:
             return
-        batch = random.sample(self.memory, self.batch_size)
-        s, a, r, s_next = zip(*batch)
+        for _ in range(self.updates_per_step):
+            self._update()
 
-        s = torch.FloatTensor(s).to(self.device)
-        a = torch.LongTensor(a).unsqueeze(1).to(self.device)
-        r = torch.FloatTensor(r).unsqueeze(1).to(self.device)
-        s_next = torch.FloatTensor(s_next).to(self.device)
+    def _update(self):
+        weights = idx = None
+        if self.prioritized:
+            s, a, r, s_next, _, weights, idx = self.memory.sample(self.batch_size)
+        else:
+            s, a, r, s_next, _ = self.memory.sample(self.batch_size)
 
-        q_values = self.model(s).gather(1, a)
-        q_next = self.target_model(s_next).max(1)[0].unsqueeze(1)
-        target = r + self.gamma * q_next
-
-        loss = nn.functional.mse_loss(q_values, target)
+        with torch.autocast(self.device.type, dtype=torch.bfloat16, enabled=self.amp):
+            loss, td_error = self._loss(s, a, r, s_next, weights)
+        if self.prioritized:
+            self.memory.update_priorities(idx, td_error.detach().float().squeeze(1).cpu().numpy())
         self.optimizer.zero_grad()
         loss.backward()
         self.optimizer.step()
+        self.train_steps += 1
+        self.update_target()
 
+    def _compute_loss(self, s, a, r, s_next, weights=None):
+        a = a.unsqueeze(1)
+        r = r.unsqueeze(1)
+
+        q_values = self.model(s).gather(1, a)
+        with torch.no_grad():
+            if self.double:
+                a_next = self.model(s_next).argmax(1, keepdim=True)
+                q_next = self.target_model(s_next).gather(1, a_next)
+            else:
+                q_next = self.target_model(s_next).max(1)[0].unsqueeze(1)
+        # Sin máscara de terminal: en este entorno done solo marca el corte de 200 pasos
+        # (truncamiento, no un estado terminal), así que se hace bootstrap siempre
+        target = r + self.gamma * q_next
+
+        td_error = target - q_values
+        if weights is not None:
+            loss = (weights.unsqueeze(1) * td_error.pow(2)).mean()
+        else:
+            loss = nn.functional.mse_loss(q_values, target)
+        return loss, td_error
+
+    def update_target(self):
+        if self.target_update == "soft":
+            with torch.no_grad():
+                for target, online in zip(self.target_model.parameters(), self.model.parameters()):
+                    target.lerp_(online, self.tau)
+        elif self.train_steps % self.target_sync_every == 0:
+            self.sync_target()
+
+    def sync_target(self):
+        self.target_model.load_state_dict(self.model.state_dict())
+
+    def get_weights(self):
+        # Copia: los parámetros pueden ser vistas de los pesos apilados de MultiAgentPolicy
+        return {k: v.detach().cpu().clone() for k, v in self.model.state_dict().items()}
+
+    def set_weights(self, weights):
+        self.model.load_state_dict(weights)
 
     def save(self, filepath):
-        torch.save(self.model.state_dict(), filepath)
+        # clone: torch.save de una vista guardaría el tensor apilado entero de MultiAgentPolicy
+        torch.save({k: v.clone() for k, v in self.model.state_dict().items()}, filepath)
+
+    def export(self, filepath):
+        # Formato según la extensión: .npz (pesos para NumpyDQN, sin torch), .onnx (requiere el
+        # paquete onnx) o TorchScript (.pt/.ts) para cargar con torch.jit.load sin esta clase
+        model = self.model.eval()
+        example = torch.zeros(1, self.state_dim, device=self.device)
+        if filepath.endswith(".npz"):
+            np.savez(filepath, **{k: v.detach().cpu().numpy() for k, v in model.state_dict().items()})
+        elif filepath.endswith(".onnx"):
+            try:
+                import onnx  # noqa: F401
+            except ImportError as exc:
+                raise ImportError("ONNX export requires the onnx package; use a .pt or .npz path instead") from exc
+            torch.onnx.export(model, (example,), filepath, input_names=["state"], output_names=["q_values"],
+                              dynamic_axes={"state": {0: "batch"}, "q_values": {0: "batch"}})
+        else:
+            with torch.no_grad():
+                torch.jit.trace(model, example).save(filepath)
 
     def load(self, filepath):
-        self.model.load_state_dict(torch.load(filepath, map_location=self.device))
+        state = torch.load(filepath, map_location=self.device)
+        dueling = "value.weight" in state
+        if dueling != self.model.dueling:
+            # La arquitectura la decide el archivo (con o sin cabeza dueling)
+            self._build_models(dueling)
+        self.model.load_state_dict(state)
         self.model.eval()
+        if not self.inference_only:
+            self.sync_target()
@@ -0,0 +1,95 @@
+import numpy as np
+import torch
+import torch.nn as nn
+
+
+class MultiAgentPolicy:
+    # Evalúa los DQN de K intersecciones en una sola pasada: los pesos de cada capa lineal se
+    # apilan en tensores (K, out, in) y se aplican con un producto por lotes (capa lineal agrupada)
+    def __init__(self, agents, seed=None):
+        self.agents = agents
+        self.rng = np.random.default_rng(seed)
+        self.num_agents = len(agents)
+        self.device = agents[0].device
+        self.epsilons = np.array([agent.epsilon for agent in agents], dtype=np.float64)
+
+        self._plan = []
+        self._stacked = []
+        for layer in agents[0].model.layers:
+            if isinstance(layer, nn.Linear):
+                weight = torch.empty((self.num_agents,) + tuple(layer.weight.shape), device=self.device)
+                bias = torch.empty((self.num_agents, layer.out_features), device=self.device)
+                self._stacked.append((weight, bias))
+                self._plan.append(len(self._stacked) - 1)
+            elif isinstance(layer, nn.ReLU):
+                self._plan.append("relu")
+            else:
+                raise TypeError(f"Unsupported layer for grouped inference: {type(layer).__name__}")
+        self._linears = [[layer for layer in agent.model.layers if isinstance(layer, nn.Linear)]
+                         for agent in agents]
+
+        # Cabeza dueling: ventaja y valor se apilan como una sola capa de A + 1 salidas
+        self.dueling = getattr(agents[0].model, "dueling", False)
+        if self.dueling:
+            head = agents[0].model
+            weight = torch.empty((self.num_agents, head.advantage.out_features + 1, head.advantage.in_features),
+                                 device=self.device)
+            bias = torch.empty((self.num_agents, head.advantage.out_features + 1), device=self.device)
+            self._stacked.append((weight, bias))
+            self._plan.append(len(self._stacked) - 1)
+            self._plan.append("dueling")
+            for agent, linears in zip(agents, self._linears):
+                linears.append((agent.model.advantage, agent.model.value))
+        self.action_dim = self._stacked[-1][0].shape[1] - self.dueling
+        self.sync()
+
+    def sync(self):
+        # Los parámetros de cada agente pasan a ser vistas de los tensores apilados: el optimizador
+        # los actualiza en su sitio y no hay que copiar nada tras cada paso de entrenamiento. Solo
+        # se copian (y se vuelven a enlazar) los que dejaron de serlo, p. ej. tras
+        # vector_to_parameters o .to(), que sustituyen el tensor; load_state_dict copia en su sitio.
+        # Llamar después de cambiar epsilon o de sustituir pesos así
+        self.epsilons[:] = [agent.epsilon for agent in self.agents]
+        with torch.no_grad():
+            for i, (weight, bias) in enumerate(self._stacked):
+                for k, linears in enumerate(self._linears):
+                    if isinstance(linears[i], tuple):
+                        advantage, value = linears[i]
+                        pairs = [(advantage.weight, weight[k, :-1]), (value.weight, weight[k, -1:]),
+                                 (advantage.bias, bias[k, :-1]), (value.bias, bias[k, -1:])]
+                    else:
+                        pairs = [(linears[i].weight, weight[k]), (linears[i].bias, bias[k])]
+                    for param, view in pairs:
+                        if param.data_ptr() != view.data_ptr():
+                            view.copy_(param)
+                            param.data = view
+
+    def q_values(self, observations):
+        # observations: (K, S) o (N, K, S) -> Q de forma (N, K, A)
+        x = torch.as_tensor(observations, dtype=torch.float32, device=self.device)
+        x = x.reshape(-1, self.num_agents, x.shape[-1]).permute(1, 2, 0)
+        for step in self._plan:
+            if step == "relu":
+                x = torch.relu(x)
+            elif step == "dueling":
+                advantage, value = x[:, :-1], x[:, -1:]
+                x = value + advantage - advantage.mean(dim=1, keepdim=True)
+            else:
+                weight, bias = self._stacked[step]
+                x = torch.baddbmm(bias.unsqueeze(2), weight, x)
+        return x.permute(2, 0, 1)
+
+    def get_actions(self, full_state):
+        # full_state: estado completo del entorno (como split_state, K partes iguales) o un lote
+        # (N, state_size). Devuelve (K,) o (N, K) acciones con exploración epsilon por agente.
+        full_state = np.asarray(full_state, dtype=np.float32)
+        batched = full_state.ndim == 2
+        obs = full_state.reshape(-1, self.num_agents, full_state.shape[-1] // self.num_agents)
+
+        with torch.no_grad():
+            actions = self.q_values(obs).argmax(dim=2).cpu().numpy()
+
+        explore = self.rng.random(actions.shape) < self.epsilons
+        if explore.any():
+            actions[explore] = self.rng.integers(0, self.action_dim, size=int(explore.sum()))
+        return actions if batched else actions[0]
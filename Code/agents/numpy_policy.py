@@ -0,0 +1,84 @@
+import random
+
+import numpy as np
+
+
+class NumpyDQN:
+    # Misma red que DQN.forward evaluada con NumPy en float32, a partir de los pesos exportados con
+    # DQNAgent.export("....npz"); no importa torch, así que arranca en milisegundos
+    def __init__(self, filepath):
+        with np.load(filepath) as data:
+            weights = {k: data[k].astype(np.float32) for k in data.files}
+        self.dueling = "value.weight" in weights
+        # Pesos traspuestos para x @ W: (entrada, salida)
+        self.w1 = np.ascontiguousarray(weights["layers.0.weight"].T)
+        self.b1 = weights["layers.0.bias"]
+        if self.dueling:
+            self.w_value = np.ascontiguousarray(weights["value.weight"].T)
+            self.b_value = weights["value.bias"]
+            self.w_advantage = np.ascontiguousarray(weights["advantage.weight"].T)
+            self.b_advantage = weights["advantage.bias"]
+            self.action_dim = len(self.b_advantage)
+        else:
+            self.w2 = np.ascontiguousarray(weights["layers.2.weight"].T)
+            self.b2 = weights["layers.2.bias"]
+            self.action_dim = len(self.b2)
+        self.state_dim = self.w1.shape[0]
+
+    def q_values(self, states):
+        # states: (state_dim,) o (N, state_dim) -> Q de forma (action_dim,) o (N, action_dim)
+        h = np.asarray(states, dtype=np.float32) @ self.w1
+        h += self.b1
+        np.maximum(h, 0, out=h)
+        if not self.dueling:
+            return h @ self.w2 + self.b2
+        advantage = h @ self.w_advantage + self.b_advantage
+        return h @ self.w_value + self.b_value + advantage - advantage.mean(axis=-1, keepdims=True)
+
+
+class NumpyDQNAgent:
+    # Sustituto de DQNAgent para evaluar: get_action con la misma exploración epsilon (self.rng).
+    # Para decidir todas las intersecciones a la vez, NumpyMultiAgentPolicy
+    def __init__(self, filepath, epsilon=0.1, seed=None):
+        self.model = NumpyDQN(filepath)
+        self.state_dim = self.model.state_dim
+        self.action_dim = self.model.action_dim
+        self.epsilon = epsilon
+        self.rng = random.Random(seed)
+
+    def get_action(self, state):
+        if self.rng.random() < self.epsilon:
+            return self.rng.randint(0, self.action_dim - 1)
+        return int(self.model.q_values(state).argmax())
+
+
+class NumpyMultiAgentPolicy:
+    # Equivalente de MultiAgentPolicy sobre NumpyDQNAgent: mismo np.random.Generator y mismo orden
+    # de sorteos en get_actions, así que con la misma semilla ambos backends exploran igual y los
+    # episodios se pueden comparar semilla a semilla
+    def __init__(self, agents, seed=None):
+        self.agents = agents
+        self.rng = np.random.default_rng(seed)
+        self.num_agents = len(agents)
+        self.action_dim = agents[0].action_dim
+        self.epsilons = np.array([agent.epsilon for agent in agents], dtype=np.float64)
+
+    def sync(self):
+        self.epsilons[:] = [agent.epsilon for agent in self.agents]
+
+    def q_values(self, observations):
+        # observations: (K, S) o (N, K, S) -> Q de forma (N, K, A)
+        obs = np.asarray(observations, dtype=np.float32)
+        obs = obs.reshape(-1, self.num_agents, obs.shape[-1])
+        return np.stack([agent.model.q_values(obs[:, k]) for k, agent in enumerate(self.agents)], axis=1)
+
+    def get_actions(self, full_state):
+        full_state = np.asarray(full_state, dtype=np.float32)
+        batched = full_state.ndim == 2
+        obs = full_state.reshape(-1, self.num_agents, full_state.shape[-1] // self.num_agents)
+        actions = self.q_values(obs).argmax(axis=2)
+
+        explore = self.rng.random(actions.shape) < self.epsilons
+        if explore.any():
+            actions[explore] = self.rng.integers(0, self.action_dim, size=int(explore.sum()))
+        return actions if batched else actions[0]
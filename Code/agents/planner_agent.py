@@ -0,0 +1,254 @@
+import itertools
+import math
+import multiprocessing as mp
+import pickle
+import queue
+import random
+import time
+
+import numpy as np
+
+REPLY_MARGIN = 0.001  # segundos que los workers dejan antes del deadline para que llegue su respuesta
+
+
+class _Node:
+    __slots__ = ("visits", "value", "children")
+
+    def __init__(self):
+        self.visits = 0
+        self.value = 0.0
+        self.children = {}
+
+
+class _Search:
+    # Árbol de lazo abierto sobre secuencias de acciones conjuntas. Cada iteración restaura el
+    # estado vivo en un entorno simulado propio y vuelve a muestrear las llegadas futuras.
+    def __init__(self, joint_actions, horizon, exploration, gamma):
+        self.joint_actions = joint_actions
+        self.num_actions = len(joint_actions)
+        self.horizon = horizon
+        self.exploration = exploration
+        self.gamma = gamma
+        self.sim = None
+        self.root = _Node()
+        self.rng = random.Random()
+
+    def reset(self, env, seed):
+        self.sim = env
+        self.sim.rng = np.random.default_rng(seed)
+        self.rng = random.Random(seed)
+        self.root = _Node()
+
+    def advance(self, action):
+        # Reutiliza el subárbol de la acción ejecutada como nueva raíz
+        self.root = self.root.children.get(action) or _Node()
+
+    def run(self, snapshot, deadline, iterations=None):
+        # deadline: instante absoluto de time.monotonic() (reloj común a todos los procesos)
+        count = 0
+        while (count < iterations) if iterations is not None else (time.monotonic() < deadline):
+            self._iterate(snapshot)
+            count += 1
+        stats = np.zeros((self.num_actions, 2))
+        for action, child in self.root.children.items():
+            stats[action] = child.visits, child.value
+        return stats
+
+    def _iterate(self, snapshot):
+        self.sim.restore(snapshot, resample=True)
+        node = self.root
+        path = [node]
+        rewards = []
+        done = False
+
+        # Selección/expansión dentro del árbol
+        while len(rewards) < self.horizon and not done:
+            if len(node.children) < self.num_actions:
+                action = self.rng.choice([a for a in range(self.num_actions) if a not in node.children])
+                node.children[action] = node = _Node()
+            else:
+                action = self._select(node)
+                node = node.children[action]
+            _, reward, done, _ = self.sim.step(self.joint_actions[action])
+            rewards.append(reward)
+            path.append(node)
+            if node.visits == 0:
+                break
+
+        # Rollout aleatorio hasta el horizonte
+        while len(rewards) < self.horizon and not done:
+            _, reward, done, _ = self.sim.step(self.joint_actions[self.rng.randrange(self.num_actions)])
+            rewards.append(reward)
+
+        returns = [0.0] * (len(rewards) + 1)
+        for k in range(len(rewards) - 1, -1, -1):
+            returns[k] = rewards[k] + self.gamma * returns[k + 1]
+        # Cada hijo acumula el retorno desde la acción que lleva a él
+        self.root.visits += 1
+        for k, child in enumerate(path[1:]):
+            child.visits += 1
+            child.value += returns[k]
+
+    def _select(self, node):
+        # UCT con los valores de los hijos normalizados a [0, 1]
+        means = [(a, child.value / child.visits, child.visits) for a, child in node.children.items()]
+        low = min(m for _, m, _ in means)
+        span = max(m for _, m, _ in means) - low or 1.0
+        log_n = math.log(node.visits)
+        return max(means, key=lambda t: (t[1] - low) / span + self.exploration * math.sqrt(log_n / t[2]))[0]
+
+
+def _worker_loop(joint_actions, horizon, exploration, gamma, commands, results, worker_id):
+    search = _Search(joint_actions, horizon, exploration, gamma)
+    while True:
+        cmd, payload = commands.get()
+        if cmd == "stop":
+            break
+        decision, env_bytes, seed, action, snapshot, deadline, iterations = payload
+        if env_bytes is not None:
+            search.reset(pickle.loads(env_bytes), seed)
+        else:
+            search.advance(action)
+        results.put((decision, search.run(snapshot, deadline, iterations)))
+
+
+class IntersectionPlanner:
+    # Adaptador de una intersección: get_action(state) -> int, como QLearningAgent o DQNAgent.
+    # El estado parcial se ignora (el planificador mira el entorno vivo); la acción conjunta se
+    # planifica una vez por paso y cada intersección recoge la suya.
+    def __init__(self, planner, index):
+        self.planner = planner
+        self.index = index
+
+    def get_action(self, state):
+        return self.planner.action_for(self.index)
+
+
+class PlannerAgent:
+    # Planificador Monte-Carlo (MCTS de lazo abierto) que decide las fases de todas las
+    # intersecciones a la vez a partir del estado vivo del entorno. budget limita el tiempo por
+    # decisión en segundos; iterations, si se da, fija el número de iteraciones (reproducible).
+    # Con workers > 1 cada proceso mantiene su propio árbol y se suman las visitas de la raíz.
+    # get_joint_action(state) devuelve una fase por intersección; para el hueco de un agente por
+    # intersección (agent.get_action(state) -> int) se usan los adaptadores de agents().
+    def __init__(self, env=None, horizon=5, budget=0.05, iterations=None, exploration=1.0,
+                 gamma=0.99, workers=1, max_actions=4096, seed=None):
+        self.horizon = horizon
+        self.budget = budget
+        self.iterations = iterations
+        self.exploration = exploration
+        self.gamma = gamma
+        self.num_workers = workers
+        self.max_actions = max_actions
+        self.rng = random.Random(seed)
+        self.env = None
+        self._workers = None
+        if env is not None:
+            self.attach(env)
+
+    def attach(self, env):
+        num_actions = env.num_directions ** env.num_intersections
+        if num_actions > self.max_actions:
+            raise ValueError(f"Joint action space has {num_actions} actions (max_actions={self.max_actions})")
+        self.env = env
+        self.joint_actions = np.array(list(itertools.product(range(env.num_directions),
+                                                             repeat=env.num_intersections)))
+        self._planned = None  # (paso, acción) de la última decisión, para reutilizar el subárbol
+        self._decision = 0  # número de decisión, para descartar respuestas tardías de workers
+        self._shared = None  # (paso, acción conjunta, intersecciones que ya la recogieron)
+        self.close()
+        if self.num_workers > 1:
+            ctx = mp.get_context("spawn")
+            self._results = ctx.Queue()
+            self._commands = [ctx.Queue() for _ in range(self.num_workers)]
+            self._workers = [
+                ctx.Process(target=_worker_loop,
+                            args=(self.joint_actions, self.horizon, self.exploration, self.gamma,
+                                  self._commands[w], self._results, w),
+                            daemon=True)
+                for w in range(self.num_workers)
+            ]
+            for p in self._workers:
+                p.start()
+        else:
+            self._search = _Search(self.joint_actions, self.horizon, self.exploration, self.gamma)
+
+    def agents(self):
+        return [IntersectionPlanner(self, k) for k in range(self.env.num_intersections)]
+
+    def action_for(self, index):
+        # Se vuelve a planificar en un paso nuevo o si esta intersección ya recogió su acción
+        step = self.env.current_step
+        if self._shared is None or self._shared[0] != step or index in self._shared[2]:
+            self._shared = (step, self.get_joint_action(None), set())
+        self._shared[2].add(index)
+        return self._shared[1][index]
+
+    def get_joint_action(self, state):
+        # El presupuesto cuenta desde aquí: un único deadline absoluto para todos los workers, así
+        # que el tiempo en cola o serializando el entorno también se descuenta
+        deadline = time.monotonic() + self.budget
+        env = self.env
+        snapshot = env.get_snapshot()
+        reuse = self._planned is not None and self._planned[0] + 1 == env.current_step
+        action = self._planned[1] if reuse else None
+
+        if self._workers is None:
+            if reuse:
+                self._search.advance(action)
+            else:
+                self._search.reset(pickle.loads(pickle.dumps(env)), self.rng.getrandbits(63))
+            stats = self._search.run(snapshot, deadline, self.iterations)
+        else:
+            self._decision += 1
+            env_bytes = None if reuse else pickle.dumps(env)
+            for q in self._commands:
+                seed = None if reuse else self.rng.getrandbits(63)
+                q.put(("plan", (self._decision, env_bytes, seed, action, snapshot, deadline - REPLY_MARGIN,
+                                self.iterations)))
+            stats = self._collect(deadline)
+
+        # Acción más visitada (desempate por valor medio)
+        visits, value = stats[:, 0], stats[:, 1]
+        mean = np.divide(value, visits, out=np.full(len(visits), -np.inf), where=visits > 0)
+        best = int(np.lexsort((mean, visits))[-1])
+        self._planned = (env.current_step, best)
+        return self.joint_actions[best].tolist()
+
+    def _collect(self, deadline):
+        # Suma las visitas de la raíz de los workers que respondan antes del deadline (con
+        # iterations fijas, de todos). Sin ninguna respuesta a tiempo se espera a la primera
+        stats = None
+        received = 0
+        while received < len(self._workers):
+            timeout = None
+            if self.iterations is None and stats is not None:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+            try:
+                decision, worker_stats = self._results.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if decision != self._decision:
+                continue  # respuesta de una decisión anterior que llegó tarde
+            stats = worker_stats if stats is None else stats + worker_stats
+            received += 1
+        return stats
+
+    def close(self):
+        if self._workers is None:
+            return
+        for q in self._commands:
+            q.put(("stop", None))
+        for p in self._workers:
+            p.join(timeout=5)
+            if p.is_alive():
+                p.terminate()
+        self._workers = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
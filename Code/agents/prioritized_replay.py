@@ -0,0 +1,90 @@
+import numpy as np
+import torch
+
+from agents.replay_buffer import ReplayBuffer
+
+
+class SumTree:
+    # Árbol binario completo en un array: la raíz es tree[1] y las hojas empiezan en leaf_offset
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.leaf_offset = 1 << max(0, (capacity - 1).bit_length())
+        self.depth = self.leaf_offset.bit_length() - 1
+        self.tree = np.zeros(2 * self.leaf_offset, dtype=np.float64)
+
+    def total(self):
+        return self.tree[1]
+
+    def get(self, idx):
+        return self.tree[np.asarray(idx) + self.leaf_offset]
+
+    def update_one(self, idx, priority):
+        node = idx + self.leaf_offset
+        self.tree[node] = priority
+        node >>= 1
+        while node >= 1:
+            self.tree[node] = self.tree[2 * node] + self.tree[2 * node + 1]
+            node >>= 1
+
+    def update(self, idx, priorities):
+        # Actualiza un lote de hojas y recalcula nivel por nivel solo los padres afectados;
+        # los índices repetidos se quedan con la última prioridad
+        nodes = np.asarray(idx, dtype=np.int64) + self.leaf_offset
+        self.tree[nodes] = priorities
+        for _ in range(self.depth):
+            nodes = np.unique(nodes >> 1)
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+
+    def find(self, values):
+        # Descenso vectorizado: O(log n) pasos para todo el lote a la vez
+        values = np.array(values, dtype=np.float64)
+        nodes = np.ones(len(values), dtype=np.int64)
+        for _ in range(self.depth):
+            left = 2 * nodes
+            left_sum = self.tree[left]
+            go_right = values > left_sum
+            values -= np.where(go_right, left_sum, 0.0)
+            nodes = left + go_right
+        return nodes - self.leaf_offset
+
+
+class PrioritizedReplayBuffer(ReplayBuffer):
+    def __init__(self, capacity, state_dim, device="cpu", alpha=0.6, beta=0.4,
+                 beta_increment=1e-4, eps=1e-6, seed=None):
+        super().__init__(capacity, state_dim, device, seed=seed)
+        self.tree = SumTree(capacity)
+        self.alpha = alpha
+        self.beta = beta
+        self.beta_increment = beta_increment
+        self.eps = eps
+        self.max_priority = 1.0
+
+    def add(self, s, a, r, s_next, done=False):
+        i = super().add(s, a, r, s_next, done)
+        self.tree.update_one(i, self.max_priority ** self.alpha)
+        return i
+
+    def add_batch(self, s, a, r, s_next, done):
+        idx = super().add_batch(s, a, r, s_next, done)
+        self.tree.update(idx, np.full(len(idx), self.max_priority ** self.alpha))
+        return idx
+
+    def sample(self, batch_size):
+        # Muestreo estratificado: un valor uniforme por segmento de la masa total
+        total = self.tree.total()
+        segment = total / batch_size
+        values = (np.arange(batch_size) + self.rng.random(batch_size)) * segment
+        idx = np.minimum(self.tree.find(values), self.size - 1)
+
+        probs = self.tree.get(idx) / total
+        weights = (self.size * probs) ** (-self.beta)
+        weights /= weights.max()
+        self.beta = min(1.0, self.beta + self.beta_increment)
+
+        weights = torch.from_numpy(weights.astype(np.float32)).to(self.device)
+        return self.gather(idx) + (weights, idx)
+
+    def update_priorities(self, idx, td_errors):
+        priorities = np.abs(td_errors) + self.eps
+        self.max_priority = max(self.max_priority, float(priorities.max()))
+        self.tree.update(idx, priorities ** self.alpha)
@@ -2,36 +2,83 @@ import numpy as np
 import random
 import pickle
 
+from agents.sparse_q_table import SparseQTable
+
 class QLearningAgent:
-    def __init__(self, state_size, action_size, alpha=0.1, gamma=0.99, epsilon=0.1):
-        self.q_table = np.zeros((2**state_size, action_size))
+    def __init__(self, state_size, action_size, alpha=0.1, gamma=0.99, epsilon=0.1, seed=None):
+        self.q_table = SparseQTable(action_size)
+        self.rng = random.Random(seed)
         self.alpha = alpha
         self.gamma = gamma
         self.epsilon = epsilon
         self.state_size = state_size
         self.action_size = action_size
 
+        if state_size > 63:
+            raise ValueError("state_size must be at most 63 bits to pack states into int64 indices")
+        # Pesos 2**k con el primer elemento como bit más significativo
+        self._bit_weights = np.left_shift(1, np.arange(state_size - 1, -1, -1, dtype=np.int64))
+
     def get_action(self, state):
         idx = self.state_to_index(state)
-        if random.random() < self.epsilon:
-            return random.randint(0, self.action_size - 1)
-        return np.argmax(self.q_table[idx])
+        if self.rng.random() < self.epsilon:
+            return self.rng.randint(0, self.action_size - 1)
+        return np.argmax(self.q_table.get(idx))
+
+    def get_actions(self, states):
+        # Acciones epsilon-greedy para una matriz (N, state_size); la exploración usa un
+        # generador NumPy sembrado desde self.rng, así que sigue siendo reproducible
+        rows = self.q_table.lookup(self.states_to_indices(states))
+        actions = np.where(rows >= 0, self.q_table.values[rows].argmax(axis=1), 0)
+        rng = np.random.default_rng(self.rng.getrandbits(64))
+        explore = rng.random(len(actions)) < self.epsilon
+        actions[explore] = rng.integers(0, self.action_size, size=int(explore.sum()))
+        return actions
+
+    def update_batch(self, states, actions, rewards, next_states):
+        # Actualización TD de N transiciones a la vez con la tabla previa al lote. Si un mismo
+        # (estado, acción) se repite en el lote se aplica la media de sus incrementos, no la suma:
+        # k copias de una transición mueven Q lo mismo que un update() (sumar k * alpha * td
+        # diverge en cuanto k * alpha > 1)
+        next_rows = self.q_table.lookup(self.states_to_indices(next_states))
+        best_next = np.where(next_rows >= 0, self.q_table.values[next_rows].max(axis=1), 0.0)
+        rows = self.q_table.rows(self.states_to_indices(states))
+        actions = np.asarray(actions, dtype=np.int64)
+        td = rewards + self.gamma * best_next - self.q_table.values[rows, actions]
+        keys, inverse = np.unique(rows * self.action_size + actions, return_inverse=True)
+        mean_td = np.bincount(inverse, weights=td) / np.bincount(inverse)
+        self.q_table.values[keys // self.action_size, keys % self.action_size] += self.alpha * mean_td
 
     def update(self, state, action, reward, next_state):
         idx = self.state_to_index(state)
         next_idx = self.state_to_index(next_state)
-        best_next = np.max(self.q_table[next_idx])
-        self.q_table[idx][action] += self.alpha * (reward + self.gamma * best_next - self.q_table[idx][action])
+        best_next = np.max(self.q_table.get(next_idx))
+        q_values = self.q_table.row(idx)
+        q_values[action] += self.alpha * (reward + self.gamma * best_next - q_values[action])
 
     def state_to_index(self, state):
         # Very simple binarization-based indexing (works if state is scaled [0,1])
-        binary_state = (state > 0.5).astype(int)
-        return int("".join(str(b) for b in binary_state), 2)
-    
+        return int((np.asarray(state) > 0.5) @ self._bit_weights)
+
+    def states_to_indices(self, states):
+        # Same indexing for a whole (N, state_size) matrix at once
+        return (np.asarray(states) > 0.5) @ self._bit_weights
+
+    def get_weights(self):
+        return self.q_table.copy()
+
+    def set_weights(self, weights):
+        self.q_table = weights
+
     def save(self, filepath):
         with open(filepath, "wb") as f:
-            pickle.dump(self.q_table, f)
+            pickle.dump(self.q_table.to_dict(), f)
 
     def load(self, filepath):
         with open(filepath, "rb") as f:
-            self.q_table = pickle.load(f)
+            data = pickle.load(f)
+        if isinstance(data, np.ndarray):
+            # Formato antiguo: tabla densa de 2**state_size filas
+            self.q_table = SparseQTable.from_dense(data)
+        else:
+            self.q_table = SparseQTable.from_dict(data)
@@ -0,0 +1,61 @@
+import numpy as np
+import torch
+
+
+class ReplayBuffer:
+    # Memoria circular preasignada: cada campo es un array fijo y `position` es el cursor de escritura
+    def __init__(self, capacity, state_dim, device="cpu", seed=None):
+        self.capacity = capacity
+        self.state_dim = state_dim
+        self.device = torch.device(device)
+        self.rng = np.random.default_rng(seed)
+
+        self.states = np.zeros((capacity, state_dim), dtype=np.float32)
+        self.actions = np.zeros(capacity, dtype=np.int64)
+        self.rewards = np.zeros(capacity, dtype=np.float32)
+        self.next_states = np.zeros((capacity, state_dim), dtype=np.float32)
+        self.dones = np.zeros(capacity, dtype=np.float32)
+
+        self.position = 0
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def add(self, s, a, r, s_next, done=False):
+        i = self.position
+        self.states[i] = s
+        self.actions[i] = a
+        self.rewards[i] = r
+        self.next_states[i] = s_next
+        self.dones[i] = done
+
+        self.position = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        return i
+
+    def add_batch(self, s, a, r, s_next, done):
+        n = len(a)
+        idx = (self.position + np.arange(n)) % self.capacity
+        self.states[idx] = s
+        self.actions[idx] = a
+        self.rewards[idx] = r
+        self.next_states[idx] = s_next
+        self.dones[idx] = done
+
+        self.position = (self.position + n) % self.capacity
+        self.size = min(self.size + n, self.capacity)
+        return idx
+
+    def sample(self, batch_size):
+        idx = self.rng.integers(0, self.size, size=batch_size)
+        return self.gather(idx)
+
+    def gather(self, idx):
+        # La indexación con arrays ya produce copias contiguas; from_numpy las envuelve sin copiar de nuevo
+        batch = (self.states[idx], self.actions[idx], self.rewards[idx],
+                 self.next_states[idx], self.dones[idx])
+        tensors = tuple(torch.from_numpy(x) for x in batch)
+        if self.device.type != "cpu":
+            tensors = tuple(t.to(self.device, non_blocking=True) for t in tensors)
+        return tensors
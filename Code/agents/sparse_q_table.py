@@ -0,0 +1,173 @@
+import numpy as np
+
+EMPTY = -1
+_HASH_MULT = 0x9E3779B97F4A7C15
+_MASK64 = (1 << 64) - 1
+
+
+class SparseQTable:
+    # Tabla Q que solo materializa los estados visitados. Un hash de direccionamiento abierto
+    # (sondeo lineal) mapea la clave entera del estado a una fila de `values`; las filas se
+    # guardan de forma contigua en orden de inserción.
+    def __init__(self, action_size, capacity=1024, max_load=0.5):
+        self.action_size = action_size
+        self.max_load = max_load
+        self.size = 0
+
+        self.row_keys = np.zeros(capacity, dtype=np.int64)
+        self.values = np.zeros((capacity, action_size), dtype=np.float64)
+        self._empty_row = np.zeros(action_size, dtype=np.float64)
+        self._empty_row.flags.writeable = False
+        self._allocate_slots(max(8, 1 << (int(capacity / max_load) - 1).bit_length()))
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, key):
+        return self._probe(key)[1]
+
+    def _allocate_slots(self, num_slots):
+        self.num_slots = num_slots
+        self._shift = 64 - (num_slots.bit_length() - 1)
+        self.slot_keys = np.full(num_slots, EMPTY, dtype=np.int64)
+        self.slot_rows = np.zeros(num_slots, dtype=np.int64)
+
+    def _hash(self, key):
+        return ((key * _HASH_MULT) & _MASK64) >> self._shift
+
+    def _hash_many(self, keys):
+        h = keys.astype(np.uint64) * np.uint64(_HASH_MULT)
+        return (h >> np.uint64(self._shift)).astype(np.int64)
+
+    def _probe(self, key):
+        key = int(key)
+        mask = self.num_slots - 1
+        slot = self._hash(key)
+        while True:
+            k = self.slot_keys[slot]
+            if k == key:
+                return slot, True
+            if k == EMPTY:
+                return slot, False
+            slot = (slot + 1) & mask
+
+    def get(self, key):
+        # Fila de solo lectura; los estados no visitados devuelven ceros sin materializarse
+        slot, found = self._probe(key)
+        if found:
+            return self.values[self.slot_rows[slot]]
+        return self._empty_row
+
+    def row(self, key):
+        # Fila escribible; crea el estado si no existe. La vista vale hasta la próxima inserción.
+        slot, found = self._probe(key)
+        if not found:
+            if self._reserve(1):
+                slot, _ = self._probe(key)
+            r = self.size
+            self.row_keys[r] = key
+            self.size += 1
+            self.slot_keys[slot] = key
+            self.slot_rows[slot] = r
+        return self.values[self.slot_rows[slot]]
+
+    def lookup(self, keys):
+        # Índices de fila para un lote de claves (-1 si el estado no existe)
+        keys = np.asarray(keys, dtype=np.int64)
+        slots = self._hash_many(keys)
+        rows = np.full(len(keys), -1, dtype=np.int64)
+        mask = self.num_slots - 1
+        pending = np.arange(len(keys))
+        while len(pending):
+            found = self.slot_keys[slots[pending]]
+            hit = found == keys[pending]
+            rows[pending[hit]] = self.slot_rows[slots[pending[hit]]]
+            pending = pending[~hit & (found != EMPTY)]
+            slots[pending] = (slots[pending] + 1) & mask
+        return rows
+
+    def rows(self, keys):
+        # Índices de fila para un lote de claves, creando de una vez los estados que falten
+        keys = np.asarray(keys, dtype=np.int64)
+        rows = self.lookup(keys)
+        missing = rows < 0
+        if missing.any():
+            new_keys, inverse = np.unique(keys[missing], return_inverse=True)
+            self._reserve(len(new_keys))
+            new_rows = np.arange(self.size, self.size + len(new_keys))
+            self.row_keys[new_rows] = new_keys
+            self.size += len(new_keys)
+            self._insert_slots(new_keys, new_rows)
+            rows[missing] = new_rows[inverse]
+        return rows
+
+    def _reserve(self, n):
+        # Asegura espacio para n estados nuevos; devuelve True si se rehízo el hash
+        needed = self.size + n
+        if needed > len(self.row_keys):
+            new_cap = len(self.row_keys)
+            while new_cap < needed:
+                new_cap *= 2
+            row_keys = np.zeros(new_cap, dtype=np.int64)
+            row_keys[:self.size] = self.row_keys[:self.size]
+            values = np.zeros((new_cap, self.action_size), dtype=np.float64)
+            values[:self.size] = self.values[:self.size]
+            self.row_keys, self.values = row_keys, values
+
+        if needed <= self.num_slots * self.max_load:
+            return False
+        num_slots = self.num_slots
+        while needed > num_slots * self.max_load:
+            num_slots *= 2
+        self._allocate_slots(num_slots)
+        self._insert_slots(self.row_keys[:self.size], np.arange(self.size))
+        return True
+
+    def _insert_slots(self, keys, rows):
+        # Inserción vectorizada de claves únicas y ausentes: en cada ronda de sondeo, el primer
+        # candidato de cada hueco libre lo ocupa y el resto avanza al siguiente hueco
+        slots = self._hash_many(keys)
+        mask = self.num_slots - 1
+        pending = np.arange(len(keys))
+        while len(pending):
+            cand = pending[self.slot_keys[slots[pending]] == EMPTY]
+            _, first = np.unique(slots[cand], return_index=True)
+            winners = cand[first]
+            self.slot_keys[slots[winners]] = keys[winners]
+            self.slot_rows[slots[winners]] = rows[winners]
+
+            placed = np.zeros(len(keys), dtype=bool)
+            placed[winners] = True
+            pending = pending[~placed[pending]]
+            slots[pending] = (slots[pending] + 1) & mask
+
+    def __reduce__(self):
+        # Al serializar (p. ej. al enviar pesos a los workers) solo viajan las filas ocupadas
+        return SparseQTable.from_dict, (self.to_dict(),)
+
+    def copy(self):
+        return SparseQTable.from_dict(self.to_dict())
+
+    def to_dict(self):
+        return {
+            "format": "sparse_q",
+            "action_size": self.action_size,
+            "keys": self.row_keys[:self.size].copy(),
+            "values": self.values[:self.size].copy(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        keys = np.asarray(data["keys"], dtype=np.int64)
+        table = cls(int(data["action_size"]), capacity=max(1024, len(keys)))
+        table.row_keys[:len(keys)] = keys
+        table.values[:len(keys)] = data["values"]
+        table.size = len(keys)
+        table._insert_slots(keys, np.arange(len(keys)))
+        return table
+
+    @classmethod
+    def from_dense(cls, q_table):
+        # Tablas densas antiguas: una fila sin valores distintos de cero equivale a un estado no visitado
+        keys = np.flatnonzero(np.any(q_table != 0, axis=1))
+        return cls.from_dict({"action_size": q_table.shape[1], "keys": keys, "values": q_table[keys]})
@@ -0,0 +1,108 @@
+# Episodios hasta alcanzar un umbral de recompensa (media móvil) para variantes de DQN
+# Uso (desde Code/): python -m benchmarks.dqn_convergence --episodes 80 --seeds 0 1 2
+import argparse
+import csv
+import time
+
+import torch
+
+from agents.dqn_agent import DQNAgent
+from agents.multi_agent_policy import MultiAgentPolicy
+from environment.arrivals import PoissonArrivals
+from environment.intersection_env import IntersectionEnv
+from environment.topology import corridor, two_intersection
+from main import learn_step, split_state
+
+CONFIGS = {
+    # Comportamiento anterior: la target nunca se sincroniza
+    "frozen-target": {"target_sync_every": 10**12, "double": False},
+    "hard": {"target_update": "hard", "double": False},
+    "hard+double": {"target_update": "hard", "double": True},
+    "soft+double": {"target_update": "soft", "double": True},
+    "dueling+double": {"target_update": "hard", "double": True, "dueling": True},
+}
+EVAL_SEED = 10_000  # semillas de evaluación, disjuntas de las de entrenamiento
+
+
+def greedy_score(env, policy, episodes, steps, seed):
+    # Recompensa media de la política sin exploración sobre episodios de evaluación fijos
+    policy.epsilons[:] = 0.0
+    total = 0.0
+    for ep in range(episodes):
+        state = env.reset(seed=seed + ep)
+        for t in range(steps):
+            state, reward, done, _ = env.step(policy.get_actions(state).tolist())
+            total += reward
+    policy.sync()
+    return total / episodes
+
+
+def make_env(topology, rate, ped_rate, seed=None):
+    return IntersectionEnv(topology, seed=seed,
+                           arrivals=PoissonArrivals(rate) if rate > 0 else None,
+                           ped_arrivals=PoissonArrivals(ped_rate) if ped_rate > 0 else None)
+
+
+def train_curve(config, episodes, steps, seed, eval_every, eval_episodes, topology=None, rate=0.0, ped_rate=0.0):
+    # Devuelve (episodio, puntuación greedy) cada eval_every episodios de entrenamiento
+    torch.manual_seed(seed)
+    env = make_env(topology, rate, ped_rate, seed)
+    eval_env = make_env(topology, rate, ped_rate)
+    state_size = len(split_state(env.reset(), 0))
+    agentA = DQNAgent(state_size, 4, seed=seed + 1, **config)
+    agentB = DQNAgent(state_size, 4, seed=seed + 2, **config)
+    policy = MultiAgentPolicy([agentA, agentB], seed=seed)
+
+    curve = []
+    for ep in range(1, episodes + 1):
+        full_state = env.reset()
+        for t in range(steps):
+            actions = policy.get_actions(full_state).tolist()
+            next_state, reward, done, _ = env.step(actions)
+            learn_step("dqn", agentA, agentB, full_state, actions, reward, next_state, done)
+            full_state = next_state
+        if ep % eval_every == 0:
+            curve.append((ep, greedy_score(eval_env, policy, eval_episodes, steps, EVAL_SEED)))
+    return curve
+
+
+def episodes_to_threshold(curve, threshold):
+    # Primer episodio de entrenamiento tras el que la evaluación greedy alcanza el umbral
+    return next((ep for ep, score in curve if score >= threshold), None)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--configs", nargs="+", choices=list(CONFIGS), default=list(CONFIGS))
+    parser.add_argument("--episodes", type=int, default=80)
+    parser.add_argument("--steps", type=int, default=200)
+    parser.add_argument("--threshold", type=float, default=1200.0, help="Recompensa greedy media a alcanzar")
+    parser.add_argument("--eval-every", type=int, default=1)
+    parser.add_argument("--eval-episodes", type=int, default=5)
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0])
+    parser.add_argument("--topology", choices=["legacy", "corridor"], default="legacy")
+    parser.add_argument("--arrival-rate", type=float, default=0.0, help="0 = entorno original, sin llegadas")
+    parser.add_argument("--ped-rate", type=float, default=0.0)
+    parser.add_argument("--output", default="dqn_convergence.csv")
+    args = parser.parse_args()
+    torch.set_num_threads(1)
+    topology = corridor(2) if args.topology == "corridor" else two_intersection()
+
+    rows = []
+    for name in args.configs:
+        for seed in args.seeds:
+            start = time.perf_counter()
+            curve = train_curve(CONFIGS[name], args.episodes, args.steps, seed, args.eval_every, args.eval_episodes,
+                                topology, args.arrival_rate, args.ped_rate)
+            elapsed = time.perf_counter() - start
+            hit = episodes_to_threshold(curve, args.threshold)
+            final = curve[-1][1] if curve else float("nan")
+            rows.append([name, seed, hit if hit is not None else "", final, elapsed])
+            print(f"{name:>15} seed={seed}: episodes_to_threshold={hit if hit is not None else f'> {args.episodes}'} "
+                  f"final_greedy={final:.1f} time={elapsed:.1f}s")
+
+    with open(args.output, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Config", "Seed", "EpisodesToThreshold", "FinalGreedyReward", "Seconds"])
+        writer.writerows(rows)
+    print(f"Saved {args.output}")
@@ -0,0 +1,62 @@
+# Pasos de gradiente y muestras por segundo de DQNAgent.train_step según batch, actualizaciones
+# por llamada, hilos de torch, autocast bfloat16 y torch.compile
+# Uso (desde Code/): python -m benchmarks.dqn_throughput --batch-sizes 32 256 --threads 1 4 --amp both
+import argparse
+import csv
+import itertools
+import time
+
+import numpy as np
+import torch
+
+from agents.dqn_agent import DQNAgent, configure_torch_threads
+
+
+def throughput(config, seconds, state_dim=16, fill=10000, seed=0):
+    torch.manual_seed(seed)
+    agent = DQNAgent(state_dim, 4, memory_size=fill, seed=seed, **config)
+    rng = np.random.default_rng(seed)
+    agent.memory.add_batch(rng.random((fill, state_dim), dtype=np.float32), rng.integers(0, 4, fill),
+                           rng.normal(size=fill), rng.random((fill, state_dim), dtype=np.float32),
+                           np.zeros(fill, dtype=np.float32))
+    for _ in range(3):
+        agent.train_step()  # calentamiento (y compilación, si se pide)
+
+    calls, start = 0, time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        agent.train_step()
+        calls += 1
+    elapsed = time.perf_counter() - start
+    grad_steps = calls * agent.updates_per_step / elapsed
+    return grad_steps, grad_steps * agent.batch_size
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[32, 128, 512])
+    parser.add_argument("--updates", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--threads", type=int, nargs="+", default=[1])
+    parser.add_argument("--amp", choices=["off", "on", "both"], default="off")
+    parser.add_argument("--compile", choices=["off", "on", "both"], default="off")
+    parser.add_argument("--per", action="store_true")
+    parser.add_argument("--seconds", type=float, default=2.0)
+    parser.add_argument("--output", default="dqn_throughput.csv")
+    args = parser.parse_args()
+    switch = {"off": [False], "on": [True], "both": [False, True]}
+
+    rows = []
+    for threads, batch, updates, amp, compiled in itertools.product(
+            args.threads, args.batch_sizes, args.updates, switch[args.amp], switch[args.compile]):
+        configure_torch_threads(threads)
+        config = {"batch_size": batch, "updates_per_step": updates, "amp": amp,
+                  "compile_loss": compiled, "prioritized": args.per}
+        grad_steps, samples = throughput(config, args.seconds)
+        rows.append([threads, batch, updates, amp, compiled, grad_steps, samples])
+        print(f"threads={threads} batch={batch:4d} updates={updates} amp={amp!s:5} compile={compiled!s:5}: "
+              f"{grad_steps:8.0f} grad steps/s  {samples:10.0f} samples/s")
+
+    with open(args.output, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Threads", "BatchSize", "UpdatesPerStep", "Amp", "Compile", "GradStepsPerSec", "SamplesPerSec"])
+        writer.writerows(rows)
+    print(f"Saved {args.output}")
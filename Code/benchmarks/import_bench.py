@@ -0,0 +1,80 @@
+# Tiempo de arranque de los scripts de entrada: cada comando se lanza en un proceso nuevo varias
+# veces y se da la mediana. Con --baseline REF mide también el árbol de esa revisión de git (por
+# ejemplo, la anterior a las importaciones diferidas) para comparar antes y después.
+# Uso (desde Code/): python -m benchmarks.import_bench --baseline HEAD~1
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+HEAVY = ("torch", "matplotlib", "pygame", "pandas")
+COMMANDS = {
+    "import main": ["-c", "import main"],
+    "main.py --help": ["main.py", "--help"],
+    "import test_agent": ["-c", "import test_agent"],
+    "test_agent.py --help": ["test_agent.py", "--help"],
+    "import plot_metrics": ["-c", "import plot_metrics"],
+}
+
+
+def loaded_modules(code_dir, module):
+    # Qué módulos pesados quedan cargados tras importar el script
+    probe = f"import sys, {module}; print(' '.join(m for m in {HEAVY!r} if m in sys.modules))"
+    out = subprocess.run([sys.executable, "-c", probe], cwd=code_dir, capture_output=True, text=True)
+    return out.stdout.strip() or "-"
+
+
+def time_command(code_dir, args, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + args, cwd=code_dir, stdout=subprocess.DEVNULL,
+                       stderr=subprocess.DEVNULL, check=True)
+        times.append(time.perf_counter() - start)
+    return float(np.median(times))
+
+
+def checkout(ref):
+    # Copia Code/ de la revisión ref en un directorio temporal
+    root = subprocess.run(["git", "rev-parse", "--show-toplevel"], capture_output=True, text=True,
+                          check=True).stdout.strip()
+    prefix = os.path.relpath(os.getcwd(), root)
+    tmp = tempfile.mkdtemp()
+    archive = subprocess.run(["git", "archive", ref, prefix], cwd=root, capture_output=True, check=True).stdout
+    subprocess.run(["tar", "-x", "-C", tmp], input=archive, check=True)
+    return tmp, os.path.join(tmp, prefix)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--baseline", default=None, help="Git revision to compare against (e.g. HEAD~1)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    trees = [("current", os.getcwd())]
+    tmp = None
+    if args.baseline:
+        tmp, baseline_dir = checkout(args.baseline)
+        trees.insert(0, (args.baseline, baseline_dir))
+    try:
+        results = {name: {} for name, _ in trees}
+        for name, code_dir in trees:
+            print(f"== {name}")
+            for label, command in COMMANDS.items():
+                seconds = time_command(code_dir, command, args.repeat)
+                results[name][label] = seconds
+                heavy = loaded_modules(code_dir, command[1].split()[1]) if command[0] == "-c" else ""
+                print(f"{label:>22}: {seconds * 1000:7.0f} ms  {heavy}")
+        if args.baseline:
+            print("== speedup")
+            for label in COMMANDS:
+                before, after = results[args.baseline][label], results["current"][label]
+                print(f"{label:>22}: {before / after:5.1f}x")
+    finally:
+        if tmp is not None:
+            shutil.rmtree(tmp, ignore_errors=True)
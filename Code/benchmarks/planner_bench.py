@@ -0,0 +1,71 @@
+# Latencia por decisión frente a recompensa: PlannerAgent con distintos presupuestos contra la DQN
+# Uso (desde Code/): python -m benchmarks.planner_bench --budgets 0.005 0.02 0.05 --episodes 3
+import argparse
+import csv
+import time
+
+import numpy as np
+
+from agents.planner_agent import PlannerAgent
+from environment.arrivals import PoissonArrivals
+from environment.intersection_env import IntersectionEnv
+from evaluation.evaluator import load_policy
+
+
+def run(env, policy, episodes, seed):
+    # Devuelve la recompensa media por episodio y las latencias de cada decisión en segundos
+    rewards, latencies = [], []
+    for ep in range(episodes):
+        if hasattr(policy, "reseed"):
+            policy.reseed(seed + ep)
+        state = env.reset(seed=seed + ep)
+        done = False
+        total = 0.0
+        while not done:
+            start = time.perf_counter()
+            actions = policy(state)
+            latencies.append(time.perf_counter() - start)
+            state, reward, done, _ = env.step(actions)
+            total += reward
+        rewards.append(total)
+    return float(np.mean(rewards)), np.array(latencies)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budgets", type=float, nargs="+", default=[0.005, 0.02, 0.05],
+                        help="Segundos por decisión del planificador")
+    parser.add_argument("--horizon", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--episodes", type=int, default=3)
+    parser.add_argument("--steps", type=int, default=200)
+    parser.add_argument("--arrival-rate", type=float, default=0.0, help="0 = entorno original, sin llegadas")
+    parser.add_argument("--ped-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="planner_bench.csv")
+    args = parser.parse_args()
+
+    env = IntersectionEnv(
+        arrivals=PoissonArrivals(args.arrival_rate) if args.arrival_rate > 0 else None,
+        ped_arrivals=PoissonArrivals(args.ped_rate) if args.ped_rate > 0 else None,
+    )
+    env.max_steps = args.steps
+
+    results = [("dqn", "", *run(env, load_policy("dqn"), args.episodes, args.seed))]
+    for budget in args.budgets:
+        with PlannerAgent(env, horizon=args.horizon, budget=budget, workers=args.workers, seed=args.seed) as planner:
+            planner.get_joint_action(env.reset(seed=args.seed))  # arranque de los workers fuera de la medida
+            results.append(("planner", budget, *run(env, planner.get_joint_action, args.episodes, args.seed)))
+
+    rows = []
+    for agent, budget, reward, latencies in results:
+        p50, p99 = np.percentile(latencies, [50, 99]) * 1e3
+        rows.append([agent, budget, reward, p50, p99, len(latencies)])
+        label = f"{agent} budget={budget * 1e3:.0f}ms" if budget != "" else agent
+        print(f"{label:>22}: reward={reward:8.1f}  p50={p50:7.2f}ms  p99={p99:7.2f}ms")
+
+    with open(args.output, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Agent", "BudgetSeconds", "AvgReward", "P50LatencyMs", "P99LatencyMs", "Decisions"])
+        writer.writerows(rows)
+    print(f"Saved {args.output}")
@@ -0,0 +1,77 @@
+# Actualizaciones TD por segundo de QLearningAgent: update() transición a transición frente a
+# update_batch() con lotes de N transiciones (como los de N entornos vectorizados)
+# --check comprueba que update_batch con transiciones repetidas mueve Q como un solo update() y
+# que sin repeticiones coincide con update() en bucle.
+# Uso (desde Code/): python -m benchmarks.q_update_bench --batch-sizes 1 64 1024 16384
+import argparse
+import time
+
+import numpy as np
+
+from agents.q_learning_agent import QLearningAgent
+
+
+def make_batch(rng, n, state_size, states_visited):
+    # Estados binarios de un conjunto limitado, para que el lote repita estados como en el entorno
+    keys = rng.integers(0, states_visited, size=(2, n))
+    bits = (keys[..., None] >> np.arange(state_size - 1, -1, -1)) & 1
+    return bits[0].astype(np.float32), rng.integers(0, 4, n), rng.normal(size=n), bits[1].astype(np.float32)
+
+
+def check(rng, state_size, copies=500):
+    s, a, r, s_next = make_batch(rng, 1, state_size, 2 ** state_size)
+    cases = {
+        "identical": (np.repeat(s, copies, 0), np.repeat(a, copies), np.repeat(r, copies),
+                      np.repeat(s_next, copies, 0)),
+        "distinct": make_distinct(rng, 256, state_size),
+    }
+    for name, (s, a, r, s_next) in cases.items():
+        single, batched = QLearningAgent(state_size, 4), QLearningAgent(state_size, 4)
+        for _ in range(3):  # varias pasadas: con la suma de incrementos se disparaba
+            batched.update_batch(s, a, r, s_next)
+            for i in range(1 if name == "identical" else len(a)):
+                single.update(s[i], a[i], r[i], s_next[i])
+        error = max(np.abs(single.q_table.get(k) - batched.q_table.get(k)).max()
+                    for k in single.states_to_indices(s))
+        print(f"{name:>20}: max |Q(update) - Q(update_batch)| = {error:.2e}")
+        if error > 1e-9:
+            raise SystemExit(f"update_batch diverges from update() on {name} transitions")
+
+
+def make_distinct(rng, n, state_size):
+    # Estados de origen distintos entre sí y disjuntos de los siguientes: sin dependencias en el lote
+    keys = rng.permutation(2 ** state_size)[:2 * n].reshape(2, n)
+    bits = (keys[..., None] >> np.arange(state_size - 1, -1, -1)) & 1
+    return bits[0].astype(np.float32), rng.integers(0, 4, n), rng.normal(size=n), bits[1].astype(np.float32)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 64, 1024, 16384])
+    parser.add_argument("--states", type=int, default=5000, help="Estados distintos de los que se muestrea")
+    parser.add_argument("--state-size", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=1.0)
+    parser.add_argument("--check", action="store_true", help="Verify update_batch against update() and exit")
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+    if args.check:
+        check(rng, args.state_size)
+        raise SystemExit
+
+    agent = QLearningAgent(args.state_size, 4)
+    s, a, r, s_next = make_batch(rng, 20000, args.state_size, args.states)
+    count, start = 0, time.perf_counter()
+    while time.perf_counter() - start < args.seconds:
+        i = count % len(a)
+        agent.update(s[i], a[i], r[i], s_next[i])
+        count += 1
+    print(f"{'update()':>20}: {count / (time.perf_counter() - start):12.0f} updates/s")
+
+    for n in args.batch_sizes:
+        agent = QLearningAgent(args.state_size, 4)
+        batch = make_batch(rng, n, args.state_size, args.states)
+        count, start = 0, time.perf_counter()
+        while time.perf_counter() - start < args.seconds:
+            agent.update_batch(*batch)
+            count += n
+        print(f"{f'update_batch(N={n})':>20}: {count / (time.perf_counter() - start):12.0f} updates/s")
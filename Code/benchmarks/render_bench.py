@@ -0,0 +1,71 @@
+# Milisegundos por frame del visualizador: frame completo (fondo, calles y pasos de peatones
+# redibujados y flip) frente al render incremental de SceneRenderer (fondo cacheado y
+# display.update solo de lo que cambió), con N intersecciones y llegadas aleatorias.
+# --check compara píxel a píxel cada frame incremental con el frame completo del mismo estado.
+# Uso (desde Code/): python -m benchmarks.render_bench --intersections 2 16 --frames 500
+import argparse
+import os
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")  # sin ventana salvo que se pida otra cosa
+import numpy as np
+import pygame
+
+from environment.arrivals import PoissonArrivals
+from environment.intersection_env import IntersectionEnv
+from environment.topology import corridor, two_intersection
+from scene_renderer import SceneRenderer, layout
+
+
+def frames(num_intersections, count, rate, seed=0):
+    topology = two_intersection() if num_intersections == 2 else corridor(num_intersections)
+    env = IntersectionEnv(topology, seed=seed, arrivals=PoissonArrivals(rate), ped_arrivals=PoissonArrivals(rate / 4))
+    env.reset()
+    rng = np.random.default_rng(seed)
+    for t in range(count):
+        yield env, [f"Step {env.current_step}", f"Vehicles crossed: {int(np.sum(env.get_vehicle_metrics()))}"]
+        _, _, done, _ = env.step(list(rng.integers(0, env.num_directions, env.num_intersections)))
+        if done:
+            env.reset()
+
+
+def measure(num_intersections, count, rate, incremental, check=False):
+    positions, size = layout(num_intersections)
+    screen = pygame.display.set_mode(size)
+    renderer = SceneRenderer(screen, positions)
+    reference = pygame.Surface(size) if check else None
+    mismatches, pixels = 0, 0
+    start = time.perf_counter()
+    for env, lines in frames(num_intersections, count, rate):
+        if incremental:
+            pixels += sum(r.width * r.height for r in renderer.draw(env, lines))
+        else:
+            renderer.redraw(env, lines)
+            pixels += size[0] * size[1]
+        if check:
+            full = SceneRenderer(reference, positions, renderer.font, renderer.font_big)
+            full.draw(env, lines)
+            mismatches += not np.array_equal(pygame.surfarray.pixels3d(screen), pygame.surfarray.pixels3d(reference))
+    elapsed = time.perf_counter() - start
+    return elapsed / count * 1000, pixels / count / (size[0] * size[1]), mismatches
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--intersections", type=int, nargs="+", default=[2, 16])
+    parser.add_argument("--frames", type=int, default=500)
+    parser.add_argument("--arrival-rate", type=float, default=0.3)
+    parser.add_argument("--check", action="store_true", help="Verify incremental frames against full redraws")
+    args = parser.parse_args()
+    pygame.init()
+
+    for n in args.intersections:
+        full_ms, _, _ = measure(n, args.frames, args.arrival_rate, incremental=False)
+        inc_ms, share, _ = measure(n, args.frames, args.arrival_rate, incremental=True)
+        check = ""
+        if args.check:  # pasada aparte, sin cronometrar
+            bad = measure(n, args.frames, args.arrival_rate, incremental=True, check=True)[2]
+            check = f"  mismatched frames: {bad}/{args.frames}"
+        print(f"{n:3d} intersections: full {full_ms:6.2f} ms/frame  incremental {inc_ms:6.2f} ms/frame "
+              f"({full_ms / inc_ms:4.1f}x, {share:5.1%} of the screen updated){check}")
+    pygame.quit()
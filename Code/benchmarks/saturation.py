@@ -0,0 +1,86 @@
+# Barrido de demanda: sube la tasa de llegadas de Poisson hasta que la cola media diverge
+# Uso (desde Code/): python -m benchmarks.saturation --agents q dqn fixed
+import argparse
+import csv
+
+import numpy as np
+
+from environment.arrivals import PoissonArrivals
+from environment.intersection_env import IntersectionEnv
+from environment.topology import corridor, two_intersection
+from evaluation.evaluator import load_policy
+
+
+class FixedCyclePolicy:
+    # Referencia de tiempo fijo: recorre las cuatro fases cada `green` pasos
+    def __init__(self, num_intersections=2, green=5):
+        self.num_intersections = num_intersections
+        self.green = green
+        self.t = 0
+
+    def __call__(self, state):
+        phase = (self.t // self.green) % 4
+        self.t += 1
+        return [phase] * self.num_intersections
+
+    def reseed(self, seed):
+        self.t = 0
+
+
+def queue_curve(policy, topology, rate, ped_rate, episodes, steps, seed):
+    env = IntersectionEnv(topology, arrivals=PoissonArrivals(rate), ped_arrivals=PoissonArrivals(ped_rate))
+    env.max_steps = steps
+    curves = np.zeros((episodes, steps))
+    for ep in range(episodes):
+        policy.reseed(seed + ep)
+        state = env.reset(seed=seed + ep)
+        for t in range(steps):
+            state, _, _, _ = env.step(policy(state))
+            curves[ep, t] = env.queues.mean()
+    return curves.mean(axis=0)
+
+
+def growth_rate(curve):
+    # Pendiente de la cola media (vehículos por aproximación y paso) en la segunda mitad
+    tail = curve[len(curve) // 2:]
+    return np.polyfit(np.arange(len(tail)), tail, 1)[0]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--agents", nargs="+", default=["q", "dqn", "fixed"])
+    parser.add_argument("--rates", type=float, nargs="+",
+                        default=[0.05, 0.1, 0.15, 0.2, 0.25, 0.3, 0.4, 0.5, 0.75, 1.0])
+    parser.add_argument("--ped-rate", type=float, default=0.02)
+    parser.add_argument("--episodes", type=int, default=5)
+    parser.add_argument("--steps", type=int, default=400)
+    parser.add_argument("--threshold", type=float, default=0.01, help="Queue growth per step considered divergent")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--topology", choices=["corridor", "legacy"], default="corridor",
+                        help="legacy = enlaces A/B originales, donde parte del tráfico circula entre A y B "
+                             "sin salir nunca de la red y las colas crecen con cualquier demanda")
+    parser.add_argument("--output", default="saturation.csv")
+    args = parser.parse_args()
+    topology = corridor(2) if args.topology == "corridor" else two_intersection()
+
+    rows = []
+    for agent_type in args.agents:
+        policy = FixedCyclePolicy() if agent_type == "fixed" else load_policy(agent_type)
+        saturation = None
+        for rate in args.rates:
+            curve = queue_curve(policy, topology, rate, args.ped_rate, args.episodes, args.steps, args.seed)
+            slope = growth_rate(curve)
+            diverged = slope > args.threshold
+            rows.append([agent_type, rate, curve.mean(), curve[-1], slope, diverged])
+            print(f"[{agent_type}] rate={rate:.2f} avg_queue={curve.mean():.2f} final={curve[-1]:.2f} "
+                  f"growth={slope:+.4f}/step{' DIVERGES' if diverged else ''}")
+            if diverged:
+                saturation = rate
+                break
+        print(f"[{agent_type}] saturation rate: {saturation if saturation is not None else f'> {args.rates[-1]}'}")
+
+    with open(args.output, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Agent", "ArrivalRate", "AvgQueue", "FinalQueue", "QueueGrowth", "Diverged"])
+        writer.writerows(rows)
+    print(f"Saved {args.output}")
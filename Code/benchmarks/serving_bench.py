@@ -0,0 +1,114 @@
+# Latencia extremo a extremo (p50/p99) del servidor de políticas con C clientes concurrentes en
+# bucle cerrado, y recarga en caliente a mitad de la medida para comprobar que no se pierde nada
+# Uso (desde Code/): python -m benchmarks.serving_bench --agent dqn --clients 1 8 64
+import argparse
+import multiprocessing as mp
+import os
+import selectors
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from environment.intersection_env import IntersectionEnv
+from evaluation.evaluator import MODEL_PATHS
+from serving.policy_server import NUM_AGENTS, PolicyServer, _make_socket
+
+
+def _serve(agent_type, address, paths, max_wait, ready):
+    if agent_type == "dqn":
+        import torch
+        torch.set_num_threads(1)
+    PolicyServer(agent_type, address, paths=paths, max_wait=max_wait, reload_every=0.2).serve_forever(ready)
+
+
+def publish(sources, targets):
+    # Como lo haría el entrenamiento: copia a un temporal y rename atómico
+    for src, dst in zip(sources, targets):
+        shutil.copyfile(src, dst + ".tmp")
+        os.replace(dst + ".tmp", dst)
+
+
+def measure(address, clients, seconds, observations, on_halfway=None):
+    # Cada cliente manda una observación, espera su respuesta y repite; devuelve latencias (s)
+    reply = NUM_AGENTS * 4
+    sel = selectors.DefaultSelector()
+    conns = []
+    for c in range(clients):
+        sock = _make_socket(address)
+        sock.connect(address)
+        conns.append(sock)
+        sel.register(sock, selectors.EVENT_READ, [c, 0.0, b""])
+
+    latencies, sent = [], 0
+    def send(sock, data):
+        nonlocal sent
+        data[1] = time.perf_counter()
+        sock.sendall(observations[sent % len(observations)])
+        sent += 1
+
+    start = time.perf_counter()
+    for sock in conns:
+        send(sock, sel.get_key(sock).data)
+    halfway = on_halfway
+    while True:
+        now = time.perf_counter()
+        if halfway is not None and now - start > seconds / 2:
+            halfway()
+            halfway = None
+        finished = now - start > seconds
+        for key, _ in sel.select(1.0):
+            data = key.data
+            data[2] += key.fileobj.recv(reply - len(data[2]))
+            if len(data[2]) == reply:
+                latencies.append(time.perf_counter() - data[1])
+                data[2] = b""
+                if not finished:
+                    send(key.fileobj, data)
+        if finished and len(latencies) == sent:
+            break
+    elapsed = time.perf_counter() - start
+    for sock in conns:
+        sock.close()
+    sel.close()
+    return np.array(latencies), sent, elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--agent", choices=["q", "dqn"], default="dqn")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 8, 64])
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--max-wait", type=float, default=0.0)
+    parser.add_argument("--unix", action="store_true", help="Use a Unix socket instead of TCP")
+    parser.add_argument("--port", type=int, default=5599)
+    parser.add_argument("--no-reload", dest="reload", action="store_false",
+                        help="Do not republish the models halfway through each run")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    paths = [os.path.join(workdir, os.path.basename(p)) for p in MODEL_PATHS[args.agent]]
+    publish(MODEL_PATHS[args.agent], paths)
+    address = os.path.join(workdir, "policy.sock") if args.unix else ("127.0.0.1", args.port)
+
+    env = IntersectionEnv(seed=0)
+    observations = [env.reset()] + [env.step([0, 0])[0] for _ in range(255)]
+    observations = [np.asarray(o, dtype=np.float32).tobytes() for o in observations]
+
+    ctx = mp.get_context("spawn")
+    ready = ctx.Event()
+    server = ctx.Process(target=_serve, args=(args.agent, address, paths, args.max_wait, ready), daemon=True)
+    server.start()
+    ready.wait()
+    try:
+        for clients in args.clients:
+            halfway = (lambda: publish(MODEL_PATHS[args.agent], paths)) if args.reload else None
+            latencies, sent, elapsed = measure(address, clients, args.seconds, observations, halfway)
+            p50, p99 = np.percentile(latencies * 1e6, [50, 99])
+            print(f"clients={clients:3d}: {len(latencies) / elapsed:8.0f} req/s  p50={p50:6.0f} us  "
+                  f"p99={p99:6.0f} us  answered {len(latencies)}/{sent}")
+    finally:
+        server.terminate()
+        server.join()
+        shutil.rmtree(workdir, ignore_errors=True)
@@ -0,0 +1,53 @@
+# Snapshots/restores por segundo de IntersectionEnv frente a copy.deepcopy
+# Uso (desde Code/): python -m benchmarks.snapshot_bench --topology grid --rows 4 --cols 4
+import argparse
+import copy
+import time
+
+import numpy as np
+
+from environment.arrivals import PoissonArrivals
+from environment.intersection_env import IntersectionEnv
+from environment.topology import grid, two_intersection
+
+
+def rate(fn, seconds):
+    # Llamadas por segundo de fn durante aproximadamente `seconds`
+    count, start = 0, time.perf_counter()
+    while True:
+        for _ in range(100):
+            fn()
+        count += 100
+        elapsed = time.perf_counter() - start
+        if elapsed >= seconds:
+            return count / elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--topology", choices=["legacy", "grid"], default="legacy")
+    parser.add_argument("--rows", type=int, default=4)
+    parser.add_argument("--cols", type=int, default=4)
+    parser.add_argument("--arrival-rate", type=float, default=0.0, help="0 = sin procesos de llegada")
+    parser.add_argument("--seconds", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    topology = grid(args.rows, args.cols) if args.topology == "grid" else two_intersection()
+    arrivals = PoissonArrivals(args.arrival_rate) if args.arrival_rate > 0 else None
+    env = IntersectionEnv(topology, seed=args.seed, arrivals=arrivals)
+    env.reset(seed=args.seed)
+    rng = np.random.default_rng(args.seed)
+    for _ in range(50):
+        env.step(rng.integers(0, env.num_directions, env.num_intersections))
+
+    snapshot = env.get_snapshot()
+    results = [
+        ("get_snapshot", rate(env.get_snapshot, args.seconds)),
+        ("restore", rate(lambda: env.restore(snapshot), args.seconds)),
+        ("deepcopy", rate(lambda: copy.deepcopy(env), args.seconds)),
+    ]
+    print(f"{env.num_intersections} intersections, snapshot {len(snapshot)} bytes")
+    for name, per_second in results:
+        print(f"{name:>12}: {per_second:12.0f}/s  {1e6 / per_second:8.2f} us")
+    print(f"restore vs deepcopy: {results[1][1] / results[2][1]:.1f}x")
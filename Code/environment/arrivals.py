@@ -0,0 +1,76 @@
+import numpy as np
+
+
+class ArrivalProcess:
+    # Genera llegadas por aproximación para un bloque de pasos: array (num_steps, I, D) de enteros
+    def generate(self, rng, start_step, num_steps, shape):
+        raise NotImplementedError
+
+
+class PoissonArrivals(ArrivalProcess):
+    # rate: llegadas medias por paso, escalar o array (I, D) por aproximación
+    def __init__(self, rate):
+        self.rate = np.asarray(rate, dtype=np.float64)
+
+    def rates(self, start_step, num_steps, shape):
+        return np.broadcast_to(self.rate, (num_steps,) + tuple(shape))
+
+    def generate(self, rng, start_step, num_steps, shape):
+        return rng.poisson(self.rates(start_step, num_steps, shape))
+
+
+class TimeOfDayArrivals(PoissonArrivals):
+    # Poisson con intensidad rate * profile[franja]; el perfil cubre un periodo de steps_per_period
+    # pasos repartidos en len(profile) franjas iguales. offset desplaza el inicio del episodio.
+    def __init__(self, rate, profile, steps_per_period, offset=0):
+        super().__init__(rate)
+        self.profile = np.asarray(profile, dtype=np.float64)
+        self.steps_per_period = steps_per_period
+        self.offset = offset
+
+    def rates(self, start_step, num_steps, shape):
+        steps = self.offset + start_step + np.arange(num_steps)
+        slot = (steps % self.steps_per_period) * len(self.profile) // self.steps_per_period
+        multiplier = self.profile[slot].reshape((num_steps,) + (1,) * len(shape))
+        return multiplier * np.broadcast_to(self.rate, tuple(shape))
+
+
+class TraceArrivals(ArrivalProcess):
+    # Llegadas registradas (T, I, D) o (T,) para todas las aproximaciones; ceros fuera de la traza
+    # salvo que cycle=True, en cuyo caso se repite
+    def __init__(self, trace, cycle=False):
+        self.trace = np.asarray(trace)
+        self.cycle = cycle
+
+    def generate(self, rng, start_step, num_steps, shape):
+        steps = start_step + np.arange(num_steps)
+        if self.cycle:
+            steps %= len(self.trace)
+        valid = steps < len(self.trace)
+        block = np.zeros((num_steps,) + tuple(shape), dtype=np.int64)
+        values = self.trace[steps[valid]]
+        block[valid] = values.reshape(values.shape + (1,) * (1 + len(shape) - values.ndim))
+        return block
+
+
+def rush_hour_profile():
+    # Multiplicadores por hora del día con picos de mañana y tarde
+    return np.array([0.2, 0.1, 0.1, 0.1, 0.2, 0.5, 1.2, 2.0, 1.8, 1.0, 0.8, 0.9,
+                     1.0, 0.9, 0.8, 0.9, 1.3, 1.9, 2.0, 1.3, 0.8, 0.6, 0.4, 0.3])
+
+
+class ArrivalStream:
+    # Sirve las llegadas de un paso desde un bloque pregenerado y pide el siguiente bloque
+    # al proceso solo cuando el paso sale del bloque actual
+    def __init__(self, process, shape, block_size=256):
+        self.process = process
+        self.shape = tuple(shape)
+        self.block_size = block_size
+        self.block = None
+        self.start = 0
+
+    def at(self, rng, step):
+        if self.block is None or not (self.start <= step < self.start + self.block_size):
+            self.block = self.process.generate(rng, step, self.block_size, self.shape)
+            self.start = step
+        return self.block[step - self.start]
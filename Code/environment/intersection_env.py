@@ -2,12 +2,80 @@ import gym
 from gym import spaces
 import numpy as np
 
+from environment.arrivals import ArrivalStream, TraceArrivals
+from environment.topology import two_intersection
+
+
+def step_intersections(queues, ped_requests, ped_timers, signals, signal_timer, ped_wait_time,
+                       actions, topology, vehicle_pass_rate, crossing_duration):
+    # Avanza un paso N mundos a la vez. Todos los arrays son (N, I, D) y se modifican en el
+    # sitio; actions es (N, I). Devuelve la recompensa total por mundo, los vehículos que
+    # cruzan por intersección y los peatones atendidos y su espera acumulada por mundo.
+    n, num_intersections, num_directions = queues.shape
+    sel = (np.arange(n)[:, None], np.arange(num_intersections)[None, :], actions)
+
+    vehicle_queue = queues[sel]
+    ped_waiting = ped_requests[sel] > 0
+    can_move = ~(ped_timers[sel] > 0)
+
+    signals[...] = 0
+    signals[sel] = 1
+
+    passed = np.minimum(vehicle_queue, vehicle_pass_rate)
+    moved = np.where(can_move, passed, 0)
+    queues[sel] -= moved
+    rewards = np.where(can_move, moved * 2.0, -1.0)
+
+    served = ped_waiting & can_move
+    served_wait = np.where(served, ped_wait_time[sel], 0).sum(axis=1)
+    ped_timers[sel] = np.where(served, crossing_duration, ped_timers[sel])
+    ped_wait_time[sel] = np.where(served, 0, ped_wait_time[sel])
+    ped_requests[sel] = np.where(served, 0, ped_requests[sel])
+    rewards += served * 3.0
+
+    # Peatones cruzando en las demás direcciones
+    crossing = ped_timers > 0
+    rewards -= 2.0 * (crossing.sum(axis=2) - crossing[sel])
+
+    active = np.arange(num_directions) == actions[..., None]
+    signal_timer[...] = np.where(active, signal_timer + 1, 0)
+    ped_timers -= ped_timers > 0
+    ped_wait_time += ped_requests
+    queues += topology.transfer(actions, moved)
+
+    return rewards.sum(axis=1), passed, served.sum(axis=1), served_wait
+
+
+_MASK64 = (1 << 64) - 1
+
+
+def _pack_rng(rng):
+    # Estado del PCG64 como 6 palabras uint64: estado e incremento de 128 bits y la caché uint32
+    state = rng.bit_generator.state
+    if state["bit_generator"] != "PCG64":
+        raise ValueError(f"Snapshot only supports PCG64 generators, got {state['bit_generator']}")
+    s, inc = state["state"]["state"], state["state"]["inc"]
+    return np.array([s & _MASK64, s >> 64, inc & _MASK64, inc >> 64,
+                     state["has_uint32"], state["uinteger"]], dtype=np.uint64).tobytes()
+
+
+def _unpack_rng(rng, words):
+    words = [int(w) for w in words]
+    rng.bit_generator.state = {
+        "bit_generator": "PCG64",
+        "state": {"state": words[0] | (words[1] << 64), "inc": words[2] | (words[3] << 64)},
+        "has_uint32": words[4],
+        "uinteger": words[5],
+    }
+
+
 class IntersectionEnv(gym.Env):
-    def __init__(self):
+    def __init__(self, topology=None, seed=None, arrivals=None, ped_arrivals=None, arrival_block=256):
         super().__init__()
 
-        self.num_intersections = 2
-        self.num_directions = 4  # N, E, S, W
+        self.topology = topology if topology is not None else two_intersection()
+        self.num_intersections = self.topology.num_intersections
+        self.num_directions = self.topology.num_directions  # N, E, S, W
         self.crossing_duration = 3
         self.vehicle_pass_rate = 2
         self.right_turn_limit = 3
@@ -16,132 +84,195 @@ class IntersectionEnv(gym.Env):
         self.action_space = spaces.MultiDiscrete([self.num_directions] * self.num_intersections)
         self.observation_space = spaces.Box(low=0, high=1, shape=(self.state_size,), dtype=np.float32)
 
+        # Procesos de llegada (environment.arrivals); sin ellos las colas solo se siembran en reset
+        self.arrivals = arrivals
+        self.ped_arrivals = ped_arrivals
+        self.arrival_block = arrival_block
+
+        # Todo el estado dinámico vive en un único buffer estructurado int32; los atributos de
+        # siempre son vistas sobre sus campos, así que clonar el entorno es copiar un bloque
+        shape = (self.num_intersections, self.num_directions)
+        self.state_dtype = np.dtype([
+            ("queues", np.int32, shape),
+            ("ped_requests", np.int32, shape),
+            ("ped_timers", np.int32, shape),
+            ("signals", np.int32, shape),
+            ("signal_timer", np.int32, shape),
+            ("ped_wait_time", np.int32, shape),
+            ("vehicles_crossed", np.int32, (self.num_intersections,)),
+            ("pedestrians_served", np.int32),
+            ("total_ped_wait_accum", np.int32),
+            ("current_step", np.int32),
+        ])
+        self._state = np.zeros((), dtype=self.state_dtype)
+        self._bind_views()
+
+        # Dos buffers de observación alternados: la observación devuelta sigue siendo válida
+        # durante el paso siguiente (el bucle de entrenamiento guarda state y next_state)
+        self._obs = np.zeros((2, self.state_size), dtype=np.float32)
+        self._obs_index = 0
+
+        self.rng = np.random.default_rng(seed)
         self.reset()
 
-        self.vehicles_crossed = [0 for _ in range(self.num_intersections)]
-
         self.current_step = 0
         self.max_steps = 200  # o el número de pasos que quieras por episodio
 
-    def reset(self):
-        self.queues = np.random.randint(0, 5, size=(self.num_intersections, self.num_directions))
-        self.ped_requests = np.random.randint(0, 2, size=(self.num_intersections, self.num_directions))
-        self.ped_timers = np.zeros_like(self.ped_requests)
-        self.signals = np.zeros_like(self.queues)
-        self.signal_timer = np.zeros_like(self.queues)
-
-        self.buffer_A_to_B = np.zeros(self.num_directions, dtype=int)
-        self.buffer_B_to_A = np.zeros(self.num_directions, dtype=int)
+    _VIEWS = ("_raw", "queues", "ped_requests", "ped_timers", "signals", "signal_timer",
+              "ped_wait_time", "vehicles_crossed")
+
+    def _bind_views(self):
+        self._raw = self._state.reshape(1).view(np.uint8)
+        self.queues = self._state["queues"]
+        self.ped_requests = self._state["ped_requests"]
+        self.ped_timers = self._state["ped_timers"]
+        self.signals = self._state["signals"]
+        self.signal_timer = self._state["signal_timer"]
+        self.ped_wait_time = self._state["ped_wait_time"]
+        self.vehicles_crossed = self._state["vehicles_crossed"]
+
+    # pickle/deepcopy copiarían cada vista por separado; se guarda solo el buffer y se
+    # vuelven a crear las vistas al cargar
+    def __getstate__(self):
+        return {k: v for k, v in self.__dict__.items() if k not in self._VIEWS}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._bind_views()
+
+    def reset(self, seed=None, options=None):
+        # seed reinicia el generador propio del entorno; options={"scenario": s} reproduce un
+        # escenario del ScenarioBank (estado inicial y trazas de llegadas en lugar de los procesos)
+        if seed is not None:
+            self.rng = np.random.default_rng(seed)
+
+        scenario = options.get("scenario") if options else None
+        if scenario is not None:
+            self.queues[...] = scenario.initial_queues
+            self.ped_requests[...] = scenario.initial_ped_requests
+            vehicle_process = TraceArrivals(scenario.vehicle_arrivals)
+            ped_process = TraceArrivals(scenario.ped_arrivals)
+        else:
+            self.queues[...] = self.rng.integers(0, 5, size=(self.num_intersections, self.num_directions))
+            self.ped_requests[...] = self.rng.integers(0, 2, size=(self.num_intersections, self.num_directions))
+            vehicle_process = self.arrivals
+            ped_process = self.ped_arrivals
+
+        shape = (self.num_intersections, self.num_directions)
+        self._vehicle_stream = ArrivalStream(vehicle_process, shape, self.arrival_block) if vehicle_process is not None else None
+        self._ped_stream = ArrivalStream(ped_process, shape, self.arrival_block) if ped_process is not None else None
+        self.ped_timers[...] = 0
+        self.signals[...] = 0
+        self.signal_timer[...] = 0
 
         # Tracking metrics
-        self.ped_wait_time = np.zeros_like(self.ped_requests)
+        self.ped_wait_time[...] = 0
         self.pedestrians_served = 0
         self.total_ped_wait_accum = 0
 
         # REINICIAR CONTADORES DE VEHÍCULOS CRUZADOS Y PASOS
-        self.vehicles_crossed = [0 for _ in range(self.num_intersections)]
+        self.vehicles_crossed[...] = 0
         self.current_step = 0
 
         return self._get_state()
 
     def step(self, actions):
-        rewards = []
-
-        for idx, action_dir in enumerate(actions):
-            reward = self._process_intersection(idx, action_dir)
-            rewards.append(reward)
-
-        self._update_signal_timers(actions)
-        self._update_pedestrian_timers()
-        self._update_pedestrian_waits()
-        self._transfer_vehicles()
+        actions = np.asarray(actions, dtype=np.int64).reshape(1, self.num_intersections)
+        rewards, passed, served, served_wait = step_intersections(
+            self.queues[None], self.ped_requests[None], self.ped_timers[None],
+            self.signals[None], self.signal_timer[None], self.ped_wait_time[None],
+            actions, self.topology, self.vehicle_pass_rate, self.crossing_duration,
+        )
+        self.vehicles_crossed += passed[0]
+        self.pedestrians_served += int(served[0])
+        self.total_ped_wait_accum += int(served_wait[0])
+        self._apply_arrivals()
 
         self.current_step += 1
         done = self.current_step >= self.max_steps
 
-        return self._get_state(), sum(rewards), done, {}
+        return self._get_state(), float(rewards[0]), done, {}
 
-    def _process_intersection(self, inter_id, action_dir):
-        vehicle_queue = self.queues[inter_id][action_dir]
-        ped_waiting = self.ped_requests[inter_id][action_dir]
-        ped_crossing = self.ped_timers[inter_id][action_dir] > 0
+    def _apply_arrivals(self):
+        if self._vehicle_stream is not None:
+            self.queues += self._vehicle_stream.at(self.rng, self.current_step)
+        if self._ped_stream is not None:
+            np.maximum(self.ped_requests, self._ped_stream.at(self.rng, self.current_step) > 0,
+                       out=self.ped_requests)
 
-        self.signals[inter_id] = 0
-        self.signals[inter_id][action_dir] = 1
+    def _get_state(self):
+        self._obs_index ^= 1
+        obs = self._obs[self._obs_index]
+        n = self.num_intersections * self.num_directions
+        np.divide(self.queues.reshape(-1), 10.0, out=obs[:n])
+        obs[n:2 * n] = self.ped_requests.reshape(-1)
+        np.greater(self.ped_timers.reshape(-1), 0, out=obs[2 * n:3 * n])
+        obs[3 * n:] = self.signals.reshape(-1)
+        return obs
+
+    def get_snapshot(self):
+        # Todo el estado dinámico como bytes planos: el buffer de estado, el estado del generador
+        # y, por cada flujo de llegadas, su inicio y el bloque pregenerado en curso. Los procesos
+        # de llegada son configuración: restore() supone el mismo entorno y el mismo episodio
+        # (mismo escenario, si lo hay) que get_snapshot()
+        parts = [self._raw.tobytes(), _pack_rng(self.rng)]
+        for stream in (self._vehicle_stream, self._ped_stream):
+            if stream is not None:
+                block = np.zeros((stream.block_size,) + stream.shape, dtype=np.int32)
+                if stream.block is not None:
+                    block[...] = stream.block
+                parts.append(np.array([stream.start, stream.block is not None], dtype=np.int64).tobytes())
+                parts.append(block.tobytes())
+        return b"".join(parts)
+
+    def restore(self, snapshot, resample=False):
+        # resample=True conserva el generador actual y descarta los bloques de llegadas, de modo
+        # que las llegadas futuras se vuelven a muestrear (ramas de Monte-Carlo a partir del estado)
+        buf = np.frombuffer(snapshot, dtype=np.uint8)
+        streams = [stream for stream in (self._vehicle_stream, self._ped_stream) if stream is not None]
+        sizes = [stream.block_size * int(np.prod(stream.shape)) * 4 for stream in streams]
+        expected = self._raw.nbytes + 48 + sum(16 + size for size in sizes)
+        if len(buf) != expected:
+            raise ValueError(f"Snapshot size {len(buf)} does not match this environment ({expected} bytes)")
+
+        offset = self._raw.nbytes
+        self._raw[...] = buf[:offset]
+        if not resample:
+            _unpack_rng(self.rng, buf[offset:offset + 48].view(np.uint64))
+        offset += 48
+        for stream, size in zip(streams, sizes):
+            start, has_block = buf[offset:offset + 16].view(np.int64)
+            offset += 16
+            block = buf[offset:offset + size].view(np.int32).reshape((stream.block_size,) + stream.shape)
+            offset += size
+            stream.start = int(start)
+            stream.block = block.copy() if has_block and not resample else None
+        return self._get_state()
 
-        reward = 0
-        can_move = not ped_crossing
+    # Contadores escalares guardados en el mismo buffer que el resto del estado
+    @property
+    def current_step(self):
+        return int(self._state["current_step"])
 
-        if can_move:
-            moved = min(vehicle_queue, self.vehicle_pass_rate)
-            self.queues[inter_id][action_dir] -= moved
-            self._buffer_vehicle(inter_id, action_dir, moved)
-            reward += moved * 2.0
-        else:
-            reward -= 1.0
-
-        if ped_waiting and not ped_crossing:
-            self.ped_timers[inter_id][action_dir] = self.crossing_duration
-            self.total_ped_wait_accum += self.ped_wait_time[inter_id][action_dir]
-            self.ped_wait_time[inter_id][action_dir] = 0
-            self.ped_requests[inter_id][action_dir] = 0
-            self.pedestrians_served += 1
-            reward += 3.0
-
-        for dir_id in range(self.num_directions):
-            if dir_id != action_dir and self.ped_timers[inter_id][dir_id] > 0:
-                reward -= 2.0
-
-        # Cuando proceses vehículos que cruzan:
-        vehicles_that_crossed = min(vehicle_queue, self.vehicle_pass_rate)  # la cantidad que cruza en este paso
-        self.vehicles_crossed[inter_id] += vehicles_that_crossed
-
-        return reward
-
-    def _buffer_vehicle(self, inter_id, exit_dir, count):
-        if count == 0:
-            return
-
-        if inter_id == 0:
-            if exit_dir == 0:
-                self.buffer_A_to_B[2] += count
-            elif exit_dir == 1:
-                self.buffer_A_to_B[0] += count
-        elif inter_id == 1:
-            if exit_dir == 2:
-                self.buffer_B_to_A[0] += count
-            elif exit_dir == 3:
-                self.buffer_B_to_A[2] += count
-
-    def _transfer_vehicles(self):
-        self.queues[1] += self.buffer_A_to_B.astype(int)
-        self.queues[0] += self.buffer_B_to_A.astype(int)
-        self.buffer_A_to_B[:] = 0
-        self.buffer_B_to_A[:] = 0
-
-    def _update_signal_timers(self, actions):
-        for inter_id, active_dir in enumerate(actions):
-            for dir_id in range(self.num_directions):
-                if dir_id == active_dir:
-                    self.signal_timer[inter_id][dir_id] += 1
-                else:
-                    self.signal_timer[inter_id][dir_id] = 0
-
-    def _update_pedestrian_timers(self):
-        for i in range(self.num_intersections):
-            for d in range(self.num_directions):
-                if self.ped_timers[i][d] > 0:
-                    self.ped_timers[i][d] -= 1
-
-    def _update_pedestrian_waits(self):
-        self.ped_wait_time += self.ped_requests  # only active requests accumulate wait time
+    @current_step.setter
+    def current_step(self, value):
+        self._state["current_step"] = value
 
-    def _get_state(self):
-        norm_queues = self.queues.flatten() / 10.0
-        ped_waiting = self.ped_requests.flatten()
-        ped_crossing = (self.ped_timers > 0).astype(float).flatten()
-        signal_status = self.signals.flatten()
-        return np.concatenate([norm_queues, ped_waiting, ped_crossing, signal_status])
+    @property
+    def pedestrians_served(self):
+        return int(self._state["pedestrians_served"])
+
+    @pedestrians_served.setter
+    def pedestrians_served(self, value):
+        self._state["pedestrians_served"] = value
+
+    @property
+    def total_ped_wait_accum(self):
+        return int(self._state["total_ped_wait_accum"])
+
+    @total_ped_wait_accum.setter
+    def total_ped_wait_accum(self, value):
+        self._state["total_ped_wait_accum"] = value
 
     def get_pedestrian_metrics(self):
         avg_wait = 0.0
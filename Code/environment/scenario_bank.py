@@ -0,0 +1,78 @@
+import argparse
+import hashlib
+
+import numpy as np
+
+
+class Scenario:
+    def __init__(self, scenario_id, initial_queues, initial_ped_requests, vehicle_arrivals, ped_arrivals):
+        self.scenario_id = scenario_id
+        self.initial_queues = initial_queues
+        self.initial_ped_requests = initial_ped_requests
+        self.vehicle_arrivals = vehicle_arrivals  # (T, I, D) vehículos que llegan en cada paso
+        self.ped_arrivals = ped_arrivals  # (T, I, D) nuevas solicitudes de peatones
+
+
+class ScenarioBank:
+    # Banco de cargas de trabajo precalculadas y reproducibles, guardado como un .npz compacto
+    def __init__(self, initial_queues, initial_ped_requests, vehicle_arrivals, ped_arrivals):
+        self.initial_queues = initial_queues
+        self.initial_ped_requests = initial_ped_requests
+        self.vehicle_arrivals = vehicle_arrivals
+        self.ped_arrivals = ped_arrivals
+
+        digest = hashlib.sha256()
+        for array in (initial_queues, initial_ped_requests, vehicle_arrivals, ped_arrivals):
+            digest.update(np.ascontiguousarray(array).tobytes())
+        self.digest = digest.hexdigest()[:12]
+
+    def __len__(self):
+        return len(self.initial_queues)
+
+    def __getitem__(self, i):
+        return Scenario(self.scenario_id(i), self.initial_queues[i], self.initial_ped_requests[i],
+                        self.vehicle_arrivals[i], self.ped_arrivals[i])
+
+    def scenario_id(self, i):
+        return f"{self.digest}-{i}"
+
+    @classmethod
+    def generate(cls, num_scenarios, num_intersections=2, num_directions=4, max_steps=200,
+                 vehicle_rate=0.0, ped_rate=0.0, seed=0):
+        # Estado inicial con la misma distribución que IntersectionEnv.reset y llegadas de Poisson
+        rng = np.random.default_rng(seed)
+        shape = (num_scenarios, num_intersections, num_directions)
+        trace_shape = (num_scenarios, max_steps, num_intersections, num_directions)
+        return cls(
+            rng.integers(0, 5, size=shape).astype(np.uint8),
+            rng.integers(0, 2, size=shape).astype(np.uint8),
+            np.minimum(rng.poisson(vehicle_rate, size=trace_shape), 255).astype(np.uint8),
+            (rng.random(trace_shape) < ped_rate).astype(np.uint8),
+        )
+
+    def save(self, path):
+        np.savez_compressed(path, initial_queues=self.initial_queues,
+                            initial_ped_requests=self.initial_ped_requests,
+                            vehicle_arrivals=self.vehicle_arrivals, ped_arrivals=self.ped_arrivals)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["initial_queues"], data["initial_ped_requests"],
+                       data["vehicle_arrivals"], data["ped_arrivals"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--out", default="scenarios.npz")
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--steps", type=int, default=200)
+    parser.add_argument("--vehicle-rate", type=float, default=0.0, help="Poisson arrivals per approach and step")
+    parser.add_argument("--ped-rate", type=float, default=0.0, help="Pedestrian request probability per approach and step")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    bank = ScenarioBank.generate(args.count, max_steps=args.steps, vehicle_rate=args.vehicle_rate,
+                                 ped_rate=args.ped_rate, seed=args.seed)
+    bank.save(args.out)
+    print(f"Saved {len(bank)} scenarios to {args.out} (id {bank.digest})")
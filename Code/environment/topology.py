@@ -0,0 +1,74 @@
+import numpy as np
+
+NORTH, EAST, SOUTH, WEST = 0, 1, 2, 3
+NUM_DIRECTIONS = 4
+
+# Enlaces originales entre A (0) y B (1): (origen, fase de salida, destino, cola de entrada)
+TWO_INTERSECTION_LINKS = [(0, NORTH, 1, SOUTH), (0, EAST, 1, NORTH), (1, SOUTH, 0, NORTH), (1, WEST, 0, SOUTH)]
+
+
+class Topology:
+    # Red de intersecciones definida por una tabla de enlaces. Cada aproximación (intersección,
+    # dirección) tiene como mucho un destino; los vehículos que salen por una aproximación sin
+    # enlace abandonan la red.
+    def __init__(self, num_intersections, links, num_directions=NUM_DIRECTIONS):
+        self.num_intersections = num_intersections
+        self.num_directions = num_directions
+        self.links = np.asarray(links, dtype=np.int64).reshape(-1, 4)
+
+        src_inter, src_dir, dst_inter, dst_dir = self.links.T
+        if len(self.links) and (
+            self.links[:, [0, 2]].min() < 0 or self.links[:, [0, 2]].max() >= num_intersections
+            or self.links[:, [1, 3]].min() < 0 or self.links[:, [1, 3]].max() >= num_directions
+        ):
+            raise ValueError("Link references an intersection or direction out of range")
+
+        src = src_inter * num_directions + src_dir
+        if len(np.unique(src)) != len(src):
+            raise ValueError("Each approach can feed at most one link")
+
+        # Tabla densa aproximación de origen -> aproximación de destino (índices planos, -1 = sale)
+        self.destination = np.full(num_intersections * num_directions, -1, dtype=np.int64)
+        self.destination[src] = dst_inter * num_directions + dst_dir
+
+    @property
+    def num_links(self):
+        return len(self.links)
+
+    def transfer(self, actions, moved):
+        # Llegadas a cada cola (N, I, D) a partir de los vehículos movidos por la fase activa:
+        # un único scatter-add (bincount) sobre todos los mundos e intersecciones
+        n = moved.shape[0]
+        size = self.num_intersections * self.num_directions
+        src = np.arange(self.num_intersections) * self.num_directions + actions
+        dst = self.destination[src]
+        linked = dst >= 0
+        flat_dst = (dst + size * np.arange(n)[:, None])[linked]
+        inflow = np.bincount(flat_dst, weights=moved[linked], minlength=n * size)
+        return inflow.astype(np.int64).reshape(n, self.num_intersections, self.num_directions)
+
+
+def two_intersection():
+    return Topology(2, TWO_INTERSECTION_LINKS)
+
+
+def grid(rows, cols):
+    # Intersección (r, c) con id r * cols + c, fila 0 al norte. Los vehículos siguen recto:
+    # la cola N circula hacia el sur y entra por la cola N del vecino sur, etc.
+    links = []
+    for r in range(rows):
+        for c in range(cols):
+            i = r * cols + c
+            if r + 1 < rows:
+                links.append((i, NORTH, i + cols, NORTH))
+            if r > 0:
+                links.append((i, SOUTH, i - cols, SOUTH))
+            if c > 0:
+                links.append((i, EAST, i - 1, EAST))
+            if c + 1 < cols:
+                links.append((i, WEST, i + 1, WEST))
+    return Topology(rows * cols, links)
+
+
+def corridor(length):
+    return grid(length, 1)
@@ -0,0 +1,153 @@
+import numpy as np
+
+from environment.intersection_env import step_intersections
+from environment.topology import two_intersection
+
+
+class VecIntersectionEnv:
+    # N copias independientes de IntersectionEnv avanzadas como un solo bloque (N, I, D).
+    # Con seed=s, el mundo n reproduce paso a paso a IntersectionEnv().reset(seed=s + n).
+    def __init__(self, num_envs, seed=None, topology=None, arrivals=None, ped_arrivals=None, arrival_block=256):
+        self.num_envs = num_envs
+        self.topology = topology if topology is not None else two_intersection()
+        self.num_intersections = self.topology.num_intersections
+        self.num_directions = self.topology.num_directions  # N, E, S, W
+        self.crossing_duration = 3
+        self.vehicle_pass_rate = 2
+        self.right_turn_limit = 3
+        self.max_steps = 200
+
+        self.state_size = self.num_intersections * self.num_directions * 4
+
+        self._seed_worlds(seed)
+
+        shape = (num_envs, self.num_intersections, self.num_directions)
+        self.queues = np.zeros(shape, dtype=np.int32)
+        self.ped_requests = np.zeros(shape, dtype=np.int32)
+        self.ped_timers = np.zeros(shape, dtype=np.int32)
+        self.signals = np.zeros(shape, dtype=np.int32)
+        self.signal_timer = np.zeros(shape, dtype=np.int32)
+        self.ped_wait_time = np.zeros(shape, dtype=np.int32)
+
+        self.pedestrians_served = np.zeros(num_envs, dtype=np.int64)
+        self.total_ped_wait_accum = np.zeros(num_envs, dtype=np.int64)
+        self.vehicles_crossed = np.zeros((num_envs, self.num_intersections), dtype=np.int32)
+        self.current_step = np.zeros(num_envs, dtype=np.int64)
+
+        # Bloques de llegadas por mundo (N, B, I, D); se regeneran cuando un mundo sale de su bloque
+        self.arrivals = arrivals
+        self.ped_arrivals = ped_arrivals
+        self.arrival_block = arrival_block
+        block_shape = (num_envs, arrival_block) + shape[1:]
+        self._vehicle_blocks = np.zeros(block_shape, dtype=np.int32) if arrivals is not None else None
+        self._ped_blocks = np.zeros(block_shape, dtype=np.int32) if ped_arrivals is not None else None
+        self._block_start = np.full(num_envs, -1, dtype=np.int64)
+
+    def _seed_worlds(self, seed):
+        if seed is None:
+            self.rngs = [np.random.default_rng() for _ in range(self.num_envs)]
+        else:
+            self.rngs = [np.random.default_rng(seed + n) for n in range(self.num_envs)]
+
+    def reset(self, seed=None):
+        if seed is not None:
+            self._seed_worlds(seed)
+        for n in range(self.num_envs):
+            self._reset_world(n)
+        return self._get_state()
+
+    def _reset_world(self, n):
+        rng = self.rngs[n]
+        self.queues[n] = rng.integers(0, 5, size=(self.num_intersections, self.num_directions))
+        self.ped_requests[n] = rng.integers(0, 2, size=(self.num_intersections, self.num_directions))
+        self.ped_timers[n] = 0
+        self.signals[n] = 0
+        self.signal_timer[n] = 0
+        self.ped_wait_time[n] = 0
+        self.pedestrians_served[n] = 0
+        self.total_ped_wait_accum[n] = 0
+        self.vehicles_crossed[n] = 0
+        self.current_step[n] = 0
+        self._block_start[n] = -1
+
+    def step(self, actions):
+        # actions: (N, I) con la fase elegida por cada intersección de cada mundo
+        actions = np.asarray(actions, dtype=np.int64).reshape(self.num_envs, self.num_intersections)
+        rewards, passed, served, served_wait = step_intersections(
+            self.queues, self.ped_requests, self.ped_timers, self.signals, self.signal_timer,
+            self.ped_wait_time, actions, self.topology, self.vehicle_pass_rate, self.crossing_duration,
+        )
+        self.vehicles_crossed += passed
+        self.pedestrians_served += served
+        self.total_ped_wait_accum += served_wait
+        if self.arrivals is not None or self.ped_arrivals is not None:
+            self._apply_arrivals()
+
+        self.current_step += 1
+        dones = self.current_step >= self.max_steps
+
+        states = self._get_state()
+        infos = [{} for _ in range(self.num_envs)]
+        for n in np.flatnonzero(dones):
+            served_n, avg_wait = self._pedestrian_metrics(n)
+            infos[n] = {
+                "terminal_observation": states[n].copy(),
+                "pedestrians_served": served_n,
+                "avg_ped_wait": avg_wait,
+                "vehicles_crossed": self.vehicles_crossed[n].copy(),
+                "terminal_queues": self.queues[n].copy(),
+            }
+            self._reset_world(n)
+            states[n] = self._get_world_state(n)
+
+        return states, rewards, dones, infos
+
+    def _apply_arrivals(self):
+        t = self.current_step
+        shape = (self.num_intersections, self.num_directions)
+        stale = (self._block_start < 0) | (t >= self._block_start + self.arrival_block)
+        for n in np.flatnonzero(stale):
+            if self.arrivals is not None:
+                self._vehicle_blocks[n] = self.arrivals.generate(self.rngs[n], t[n], self.arrival_block, shape)
+            if self.ped_arrivals is not None:
+                self._ped_blocks[n] = self.ped_arrivals.generate(self.rngs[n], t[n], self.arrival_block, shape)
+            self._block_start[n] = t[n]
+
+        env_idx = np.arange(self.num_envs)
+        offset = t - self._block_start
+        if self._vehicle_blocks is not None:
+            self.queues += self._vehicle_blocks[env_idx, offset]
+        if self._ped_blocks is not None:
+            np.maximum(self.ped_requests, self._ped_blocks[env_idx, offset] > 0, out=self.ped_requests)
+
+    def _get_state(self):
+        n = self.num_envs
+        return np.concatenate([
+            self.queues.reshape(n, -1) / 10.0,
+            self.ped_requests.reshape(n, -1),
+            self.ped_timers.reshape(n, -1) > 0,
+            self.signals.reshape(n, -1),
+        ], axis=1, dtype=np.float32)
+
+    def _get_world_state(self, n):
+        return np.concatenate([
+            self.queues[n].reshape(-1) / 10.0,
+            self.ped_requests[n].reshape(-1),
+            self.ped_timers[n].reshape(-1) > 0,
+            self.signals[n].reshape(-1),
+        ], dtype=np.float32)
+
+    def _pedestrian_metrics(self, n):
+        avg_wait = 0.0
+        if self.pedestrians_served[n] > 0:
+            avg_wait = self.total_ped_wait_accum[n] / self.pedestrians_served[n]
+        return int(self.pedestrians_served[n]), avg_wait
+
+    def get_pedestrian_metrics(self):
+        served = self.pedestrians_served.copy()
+        avg_wait = np.divide(self.total_ped_wait_accum, served,
+                             out=np.zeros(self.num_envs), where=served > 0)
+        return served, avg_wait
+
+    def get_vehicle_metrics(self):
+        return self.vehicles_crossed.copy()
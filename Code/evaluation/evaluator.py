@@ -0,0 +1,222 @@
+import csv
+import hashlib
+import json
+import math
+import os
+import multiprocessing as mp
+import random
+
+import numpy as np
+
+from environment.intersection_env import IntersectionEnv
+
+METRICS = ["Reward", "VehiclesCrossed", "PedestriansServed", "AvgPedWait"]
+
+
+def split_state(full_state, agent_id, total_agents=2):
+    size = len(full_state) // total_agents
+    return full_state[agent_id * size:(agent_id + 1) * size]
+
+
+class EvaluationPolicy:
+    # Agentes cargados + función estado -> acciones; reseed hace reproducible la exploración
+    def __init__(self, agents, select, multi_policy=None):
+        self.agents = agents
+        self.select = select
+        self.multi_policy = multi_policy
+
+    def __call__(self, state):
+        return self.select(state)
+
+    def reseed(self, seed):
+        for k, agent in enumerate(self.agents):
+            agent.rng = random.Random(seed * len(self.agents) + k)
+        if self.multi_policy is not None:
+            self.multi_policy.rng = np.random.default_rng(seed)
+
+
+MODEL_PATHS = {
+    "q": ("models/agentA_q.pkl", "models/agentB_q.pkl"),
+    "dqn": ("models/agentA_dqn.pth", "models/agentB_dqn.pth"),
+}
+# backend="numpy": pesos exportados a .npz (DQNAgent.export), evaluados sin importar torch
+NUMPY_PATHS = {
+    "dqn": ("models/agentA_dqn.npz", "models/agentB_dqn.npz"),
+}
+
+
+def model_paths(agent_type, backend="torch"):
+    if backend == "numpy":
+        return NUMPY_PATHS.get(agent_type, MODEL_PATHS[agent_type])
+    return MODEL_PATHS[agent_type]
+
+
+def load_policy(agent_type, action_size=4, paths=None, backend="torch"):
+    # Carga los agentes entrenados de models/ (o de paths: (agente A, agente B))
+    if agent_type not in MODEL_PATHS:
+        raise ValueError("Invalid agent type")
+    if backend not in ("torch", "numpy"):
+        raise ValueError("Invalid backend")
+    state_size = IntersectionEnv().state_size // 2
+    pathA, pathB = paths or model_paths(agent_type, backend)
+
+    if agent_type == "q":
+        from agents.q_learning_agent import QLearningAgent
+        agentA = QLearningAgent(state_size, action_size)
+        agentB = QLearningAgent(state_size, action_size)
+        agentA.load(pathA)
+        agentB.load(pathB)
+        return EvaluationPolicy(
+            [agentA, agentB],
+            lambda state: [agentA.get_action(split_state(state, 0)), agentB.get_action(split_state(state, 1))],
+        )
+
+    if backend == "numpy":
+        # Misma exploración que MultiAgentPolicy: resultados comparables con el backend torch
+        from agents.numpy_policy import NumpyDQNAgent, NumpyMultiAgentPolicy
+        agentA = NumpyDQNAgent(pathA)
+        agentB = NumpyDQNAgent(pathB)
+        policy = NumpyMultiAgentPolicy([agentA, agentB])
+        return EvaluationPolicy([agentA, agentB], lambda state: policy.get_actions(state).tolist(), policy)
+
+    from agents.dqn_agent import DQNAgent
+    from agents.multi_agent_policy import MultiAgentPolicy
+    agentA = DQNAgent(state_size, action_size)
+    agentB = DQNAgent(state_size, action_size)
+    agentA.load(pathA)
+    agentB.load(pathB)
+    policy = MultiAgentPolicy([agentA, agentB])
+    return EvaluationPolicy([agentA, agentB], lambda state: policy.get_actions(state).tolist(), policy)
+
+
+def model_hash(agent_type, backend="torch"):
+    digest = hashlib.sha256()
+    for path in model_paths(agent_type, backend):
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def run_episodes(policy, episodes, observer=None):
+    # episodes: lista de (número de episodio, semilla o None, Scenario o None). El observer, si
+    # existe, recibe el entorno antes de cada paso y puede cortar la evaluación devolviendo False.
+    env = IntersectionEnv()
+    rows = []
+    for ep, seed, scenario in episodes:
+        if seed is not None:
+            policy.reseed(seed)
+        options = {"scenario": scenario} if scenario is not None else None
+        state = env.reset(seed=seed, options=options)
+        done = False
+        ep_reward = 0
+
+        while not done:
+            if observer is not None and not observer.on_step(env, ep, len(episodes)):
+                return rows
+            state, reward, done, _ = env.step(policy(state))
+            ep_reward += reward
+
+        served, avg_wait = env.get_pedestrian_metrics()
+        rows.append({
+            "Episode": ep,
+            "Reward": ep_reward,
+            "VehiclesCrossed": int(np.sum(env.get_vehicle_metrics())),
+            "PedestriansServed": served,
+            "AvgPedWait": avg_wait,
+            "Seed": seed,
+            "Scenario": scenario.scenario_id if scenario is not None else "",
+        })
+        if observer is not None:
+            observer.on_episode(rows[-1])
+    return rows
+
+
+_worker_policy = None
+
+
+def _init_worker(agent_type, backend):
+    global _worker_policy
+    if agent_type == "dqn" and backend == "torch":
+        import torch
+        torch.set_num_threads(1)
+    _worker_policy = load_policy(agent_type, backend=backend)
+
+
+def _run_chunk(episodes):
+    return run_episodes(_worker_policy, episodes)
+
+
+def evaluate(agent_type, seeds, workers=1, scenarios=None, backend="torch"):
+    # Evaluación sin render: un episodio por semilla (y escenario, si se da), repartidos entre procesos
+    if scenarios is None:
+        scenarios = [None] * len(seeds)
+    episodes = [(ep, int(seed), scenario) for ep, (seed, scenario) in enumerate(zip(seeds, scenarios), start=1)]
+    if not episodes:
+        return []
+    if workers <= 1:
+        return run_episodes(load_policy(agent_type, backend=backend), episodes)
+
+    chunk = max(1, math.ceil(len(episodes) / (workers * 4)))
+    chunks = [episodes[i:i + chunk] for i in range(0, len(episodes), chunk)]
+    ctx = mp.get_context("spawn")
+    with ctx.Pool(workers, initializer=_init_worker, initargs=(agent_type, backend)) as pool:
+        results = pool.map(_run_chunk, chunks)
+    return [row for rows in results for row in rows]
+
+
+def evaluate_bank(agent_type, bank, workers=1, cache_path=None, backend="torch"):
+    # Evalúa todos los escenarios del banco; los resultados se cachean por (escenario, hash del modelo)
+    cache = {}
+    if cache_path is not None and os.path.exists(cache_path):
+        with open(cache_path) as f:
+            cache = json.load(f)
+
+    version = model_hash(agent_type, backend)
+    keys = [f"{bank.scenario_id(i)}:{agent_type}:{version}" for i in range(len(bank))]
+    missing = [i for i, key in enumerate(keys) if key not in cache]
+
+    rows = evaluate(agent_type, missing, workers=workers, scenarios=[bank[i] for i in missing], backend=backend)
+    for i, row in zip(missing, rows):
+        cache[keys[i]] = row
+
+    if cache_path is not None and missing:
+        tmp_path = cache_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(cache, f)
+        os.replace(tmp_path, cache_path)
+
+    results = []
+    for i, key in enumerate(keys, start=1):
+        row = dict(cache[key])
+        row["Episode"] = i
+        results.append(row)
+    return results
+
+
+def confidence_intervals(rows, z=1.96):
+    # Media e intervalo de confianza normal (z=1.96 -> 95%) por métrica
+    summary = []
+    for metric in METRICS:
+        values = np.array([row[metric] for row in rows], dtype=np.float64)
+        n = len(values)
+        mean = values.mean() if n else float("nan")
+        std = values.std(ddof=1) if n > 1 else 0.0
+        half = z * std / math.sqrt(n) if n else float("nan")
+        summary.append({"Metric": metric, "N": n, "Mean": mean, "Std": std,
+                        "CILow": mean - half, "CIHigh": mean + half})
+    return summary
+
+
+def write_metrics(rows, path="test_metrics.csv"):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Episode"] + METRICS + ["Seed", "Scenario"])
+        for row in rows:
+            writer.writerow([row["Episode"]] + [row[m] for m in METRICS] + [row["Seed"], row["Scenario"]])
+
+
+def write_summary(summary, path):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["Metric", "N", "Mean", "Std", "CILow", "CIHigh"])
+        writer.writeheader()
+        writer.writerows(summary)
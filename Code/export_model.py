@@ -0,0 +1,49 @@
+# Exporta los DQN entrenados de models/ para usarlos sin DQNAgent: .npz (backend NumPy de
+# test_agent.py), TorchScript (.pt) u ONNX (.onnx, requiere el paquete onnx)
+# Uso (desde Code/): python export_model.py --formats npz torchscript
+import argparse
+import os
+
+import numpy as np
+import torch
+
+from agents.dqn_agent import DQNAgent
+from agents.numpy_policy import NumpyDQN
+from environment.intersection_env import IntersectionEnv
+from evaluation.evaluator import MODEL_PATHS
+
+EXTENSIONS = {"npz": ".npz", "torchscript": ".pt", "onnx": ".onnx"}
+
+
+def check_npz(agent, npz_path, states):
+    # El backend NumPy tiene que elegir la misma acción que la red de torch
+    with torch.no_grad():
+        expected = agent.model(torch.from_numpy(states)).argmax(dim=1).numpy()
+    return int((NumpyDQN(npz_path).q_values(states).argmax(axis=1) != expected).sum())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--formats", nargs="+", choices=list(EXTENSIONS), default=["npz", "torchscript"])
+    parser.add_argument("--check-states", type=int, default=10000,
+                        help="Random observations on which the .npz argmax is compared with torch")
+    args = parser.parse_args()
+
+    env = IntersectionEnv()
+    state_size = env.state_size // 2
+    rng = np.random.default_rng(0)
+    for path in MODEL_PATHS["dqn"]:
+        agent = DQNAgent(state_size, 4)
+        agent.load(path)
+        base = os.path.splitext(path)[0]
+        for fmt in args.formats:
+            out = base + EXTENSIONS[fmt]
+            try:
+                agent.export(out)
+            except ImportError as exc:
+                print(f"Skipping {out}: {exc}")
+                continue
+            print(f"Saved {out}")
+            if fmt == "npz" and args.check_states:
+                states = rng.random((args.check_states, state_size), dtype=np.float32)
+                print(f"  argmax mismatches vs torch: {check_npz(agent, out, states)}/{args.check_states}")
@@ -0,0 +1,194 @@
+# Simulación y render desacoplados: la simulación corre en su propio hilo al ritmo pedido (o a
+# toda velocidad) y publica un snapshot del entorno antes de cada paso; el hilo principal dibuja
+# el último snapshot a su propio ritmo sobre una réplica del entorno, así que se saltan frames si
+# la simulación va más rápido que la pantalla y se mantiene el último estado si va más lenta.
+# Teclas: espacio pausa, +/- (o flechas) multiplican o dividen la velocidad, m alterna velocidad
+# máxima, g <número> Enter avanza a toda velocidad hasta ese paso y pausa, Esc/q sale.
+import copy
+import math
+import threading
+import time
+
+import pygame
+
+from scene_renderer import SceneRenderer, layout
+
+
+class SimulationClock:
+    # Observer de run_episodes (o de cualquier bucle que llame a on_step antes de cada paso): marca
+    # el ritmo de la simulación y publica snapshots. Los pasos se cuentan a lo largo de todos los
+    # episodios; steps_per_second=math.inf no espera nunca.
+    def __init__(self, steps_per_second=5.0, run_to=None, on_episode=None):
+        self.steps_per_second = steps_per_second
+        self.warp = 1.0
+        self.max_speed = False
+        self.paused = False
+        self.running = True
+        self.target_step = run_to
+        self.total_steps = 0
+        self.on_episode_callback = on_episode
+        self._lock = threading.Lock()
+        self._latest = None  # (total_steps, snapshot, ep, episodes)
+        self._template = None  # copia del entorno para reconstruir los snapshots en el render
+        self._snapshot_size = None
+        self._next = None
+
+    @property
+    def rate(self):
+        if self.max_speed or self.target_step is not None:
+            return math.inf
+        return self.steps_per_second * self.warp
+
+    def on_step(self, env, ep, episodes):
+        snapshot = env.get_snapshot()
+        with self._lock:
+            if len(snapshot) != self._snapshot_size:
+                # Primer paso, o el entorno cambió de configuración (p. ej. otro escenario)
+                self._template = copy.deepcopy(env)
+                self._snapshot_size = len(snapshot)
+            self._latest = (self.total_steps, snapshot, ep, episodes)
+
+        if self.target_step is not None and self.total_steps >= self.target_step:
+            self.target_step = None
+            self.paused = True
+        while self.paused and self.running:
+            time.sleep(0.01)
+            self._next = None
+        if not self.running:
+            return False
+
+        rate = self.rate
+        now = time.perf_counter()
+        if math.isinf(rate):
+            self._next = None
+        else:
+            # Reloj absoluto: no acumula deriva, y tras una pausa o un cambio de velocidad arranca de nuevo
+            self._next = now + 1.0 / rate if self._next is None else max(self._next + 1.0 / rate, now)
+            if self._next > now:
+                time.sleep(self._next - now)
+        self.total_steps += 1
+        return True
+
+    def on_episode(self, row):
+        if self.on_episode_callback is not None:
+            self.on_episode_callback(row)
+
+    def latest(self):
+        with self._lock:
+            return self._latest, self._template
+
+    def stop(self):
+        self.running = False
+
+
+class LiveViewer:
+    # Bucle de render en el hilo principal: eventos de teclado, último snapshot y SceneRenderer
+    def __init__(self, sim_clock, fps=60, caption="Traffic Simulation"):
+        self.sim = sim_clock
+        self.fps = fps
+        self.caption = caption
+        self.typing = None  # dígitos de "ir al paso N" mientras se escriben
+        self._replica = None
+        self._template = None
+        self._shown = None
+
+    def _handle_key(self, event):
+        sim = self.sim
+        if self.typing is not None:
+            if event.key in (pygame.K_RETURN, pygame.K_KP_ENTER):
+                if self.typing:
+                    sim.target_step = int(self.typing)
+                    sim.paused = False
+                self.typing = None
+            elif event.key == pygame.K_ESCAPE:
+                self.typing = None
+            elif event.key == pygame.K_BACKSPACE:
+                self.typing = self.typing[:-1]
+            elif event.unicode.isdigit():
+                self.typing += event.unicode
+            return
+        if event.key in (pygame.K_ESCAPE, pygame.K_q):
+            sim.stop()
+        elif event.key == pygame.K_SPACE:
+            sim.paused = not sim.paused
+        elif event.key in (pygame.K_PLUS, pygame.K_EQUALS, pygame.K_KP_PLUS, pygame.K_RIGHT, pygame.K_UP):
+            sim.warp *= 2
+        elif event.key in (pygame.K_MINUS, pygame.K_KP_MINUS, pygame.K_LEFT, pygame.K_DOWN):
+            sim.warp /= 2
+        elif event.key == pygame.K_m:
+            sim.max_speed = not sim.max_speed
+        elif event.key == pygame.K_g:
+            self.typing = ""
+
+    def _status(self, step, ep, episodes):
+        sim = self.sim
+        if sim.target_step is not None:
+            speed = f"running to step {sim.target_step}"
+        elif sim.max_speed:
+            speed = "max speed"
+        else:
+            speed = f"{sim.steps_per_second * sim.warp:g} steps/s (x{sim.warp:g})"
+        if sim.paused:
+            speed += " | paused"
+        line = f"Step {step} | Episode {ep}/{episodes} | {speed}"
+        if self.typing is not None:
+            line += f" | run to step: {self.typing}_"
+        return line
+
+    def run(self, thread):
+        # Dibuja hasta que la simulación termine o se cierre la ventana
+        pygame.init()
+        pygame.display.set_caption(self.caption)
+        clock = pygame.time.Clock()
+        renderer = None
+        try:
+            while thread.is_alive():
+                for event in pygame.event.get():
+                    if event.type == pygame.QUIT:
+                        self.sim.stop()
+                    elif event.type == pygame.KEYDOWN:
+                        self._handle_key(event)
+                    elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWRESTORED) and renderer is not None:
+                        renderer.invalidate()
+
+                latest, template = self.sim.latest()
+                if latest is not None:
+                    step, snapshot, ep, episodes = latest
+                    if template is not self._template:
+                        self._template = template
+                        self._replica = copy.deepcopy(template)
+                    if renderer is None:
+                        positions, size = layout(self._replica.num_intersections)
+                        renderer = SceneRenderer(pygame.display.set_mode(size), positions)
+                    if snapshot is not self._shown:
+                        self._replica.restore(snapshot)
+                        self._shown = snapshot
+                    env = self._replica
+                    served, wait = env.get_pedestrian_metrics()
+                    renderer.draw(env, [self._status(step, ep, episodes),
+                                        f"Pedestrians served: {served} | Avg wait: {wait:.2f}",
+                                        f"Vehicles crossed: {int(env.get_vehicle_metrics().sum())}"])
+                clock.tick(self.fps)
+        finally:
+            self.sim.stop()
+            pygame.quit()
+
+
+def watch(simulate, sim_clock, fps=60, caption="Traffic Simulation"):
+    # simulate(observer) corre en un hilo aparte con sim_clock como observer; la ventana, en este.
+    # Devuelve lo que devuelva simulate (y relanza sus excepciones).
+    result = {}
+
+    def target():
+        try:
+            result["value"] = simulate(sim_clock)
+        except BaseException as exc:
+            result["error"] = exc
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    LiveViewer(sim_clock, fps, caption).run(thread)
+    thread.join()
+    if "error" in result:
+        raise result["error"]
+    return result.get("value")
@@ -1,77 +1,195 @@
 from environment.intersection_env import IntersectionEnv
-from agents.q_learning_agent import QLearningAgent
-from agents.dqn_agent import DQNAgent
+from training.metrics_writer import (EPISODE_COLUMNS, STEP_COLUMNS, MetricsWriter, StepAggregator,
+                                     read_metrics, truncate_metrics)
+from training.checkpoint import load_checkpoint, save_checkpoint
+from plotting import pyplot
 import argparse
 import numpy as np
-import matplotlib.pyplot as plt
-import csv
+
+# torch, matplotlib y los módulos de entrenamiento se importan donde se usan: --agent q no carga
+# torch, y --help o un entrenamiento sin gráfica no cargan matplotlib
 
 def split_state(full_state, agent_id, total_agents=2):
     size = len(full_state) // total_agents
     return full_state[agent_id * size:(agent_id + 1) * size]
 
-def train_multi_agent(agent_type="q", episodes=100):
-    env = IntersectionEnv()
+def learn_step(agent_type, agentA, agentB, full_state, actions, reward, next_state, done):
+    stateA = split_state(full_state, 0)
+    stateB = split_state(full_state, 1)
+    nextA = split_state(next_state, 0)
+    nextB = split_state(next_state, 1)
+
+    if agent_type == "q":
+        agentA.update(stateA, actions[0], reward / 2, nextA)
+        agentB.update(stateB, actions[1], reward / 2, nextB)
+    else:
+        agentA.remember(stateA, actions[0], reward / 2, nextA, done)
+        agentB.remember(stateB, actions[1], reward / 2, nextB, done)
+        agentA.train_step()
+        agentB.train_step()
+
+def train_multi_agent(agent_type="q", episodes=100, workers=1, sync_every=5, buffer_size=10000, per=False, seed=None,
+                      dqn_config=None, actors=0, envs_per_actor=8, num_envs=1,
+                      metrics_path="training_metrics.csv", steps_path="training_steps.csv", flush_every=10,
+                      step_window=20, checkpoint_dir="checkpoints", checkpoint_every=0, resume=False):
+    # Con seed, el entorno usa seed, los agentes seed + 1 y seed + 2 y los workers seed + 3.
+    # dqn_config: argumentos extra de DQNAgent (target_update, double, dueling...)
+    # checkpoint_every/resume: checkpoints cada N episodios y reanudación exacta (solo en serie)
+    dqn_config = dqn_config or {}
+    env = IntersectionEnv(seed=seed)
     state_size = len(split_state(env.reset(), 0))
     action_size = 4
 
+    seedA = None if seed is None else seed + 1
+    seedB = None if seed is None else seed + 2
+
     if agent_type == "q":
-        agentA = QLearningAgent(state_size, action_size)
-        agentB = QLearningAgent(state_size, action_size)
+        from agents.q_learning_agent import QLearningAgent
+        agentA = QLearningAgent(state_size, action_size, seed=seedA)
+        agentB = QLearningAgent(state_size, action_size, seed=seedB)
     elif agent_type == "dqn":
-        agentA = DQNAgent(state_size, action_size)
-        agentB = DQNAgent(state_size, action_size)
+        import torch
+        from agents.dqn_agent import DQNAgent
+        if seed is not None:
+            torch.manual_seed(seed)
+        agentA = DQNAgent(state_size, action_size, memory_size=buffer_size, prioritized=per, seed=seedA, **dqn_config)
+        agentB = DQNAgent(state_size, action_size, memory_size=buffer_size, prioritized=per, seed=seedB, **dqn_config)
     else:
         raise ValueError("Invalid agent type")
 
-    rewards = []
-    avg_queues = []
-    ped_served_list = []
-    ped_wait_list = []
-
-    for ep in range(episodes):
-        full_state = env.reset()
-        total_reward = 0
-        queue_sum = 0
-        steps = 0
-
-        for t in range(200):
-            stateA = split_state(full_state, 0)
-            stateB = split_state(full_state, 1)
-
-            actionA = agentA.get_action(stateA)
-            actionB = agentB.get_action(stateB)
-            actions = [actionA, actionB]
-
-            next_state, reward, done, _ = env.step(actions)
-
-            nextA = split_state(next_state, 0)
-            nextB = split_state(next_state, 1)
-
-            if agent_type == "q":
-                agentA.update(stateA, actionA, reward / 2, nextA)
-                agentB.update(stateB, actionB, reward / 2, nextB)
-            else:
-                agentA.remember(stateA, actionA, reward / 2, nextA)
-                agentB.remember(stateB, actionB, reward / 2, nextB)
-                agentA.train_step()
-                agentB.train_step()
-
-            full_state = next_state
-            total_reward += reward
-            queue_sum += np.mean(env.queues)
-            steps += 1
-
-        avg_queue = queue_sum / steps
-        rewards.append(total_reward)
-        avg_queues.append(avg_queue)
+    serial = actors == 0 and num_envs <= 1 and workers <= 1
+    if (checkpoint_every or resume) and not serial:
+        raise ValueError("Checkpointing is only supported for serial training (no --workers, --num-envs or --actors)")
+    # Con DQN ambos agentes eligen acción en una sola pasada por la red; sus pesos son vistas de
+    # los de la política, así que train_step la mantiene al día sin copias
+    policy = None
+    if agent_type == "dqn":
+        from agents.multi_agent_policy import MultiAgentPolicy
+        policy = MultiAgentPolicy([agentA, agentB], seed=seed)
+    start = 0
+    if resume:
+        start = load_checkpoint(checkpoint_dir, env, [agentA, agentB], policy)
+        if start is None:
+            raise ValueError(f"No checkpoint found in {checkpoint_dir}")
+        # Las filas volcadas después del checkpoint se repiten al reanudar
+        truncate_metrics(metrics_path, start)
+        truncate_metrics(steps_path, start)
+        print(f"Resuming from episode {start} ({checkpoint_dir})")
 
-        served, avg_wait = env.get_pedestrian_metrics()
-        ped_served_list.append(served)
-        ped_wait_list.append(avg_wait)
+    # Métricas en streaming: se vuelcan cada flush_every episodios y se pueden leer durante el
+    # entrenamiento. Los agregados por ventana de pasos solo existen en el bucle serie, así que
+    # solo ahí se abre (y se sobrescribe) su archivo; se vuelca en los límites de episodio.
+    rewards = read_metrics(metrics_path)["TotalReward"].tolist() if resume else []
+    episode_log = MetricsWriter(metrics_path, EPISODE_COLUMNS, flush_every=flush_every, append=resume)
+    step_log = None
+    if serial:
+        step_log = StepAggregator(MetricsWriter(steps_path, STEP_COLUMNS, flush_every=0, append=resume),
+                                  step_window)
 
+    def record_episode(ep, total_reward, avg_queue, served, avg_wait):
+        rewards.append(total_reward)
+        episode_log.write([ep + 1, total_reward, avg_queue, served, avg_wait])
         print(f"[{agent_type.upper()}] Ep {ep+1}: Reward={total_reward:.1f}, Queue={avg_queue:.2f}, Peds={served}, Wait={avg_wait:.2f}")
 
+    if actors > 0:
+        # Actores y learner desacoplados: los episodios llegan mientras el learner entrena
+        if agent_type != "dqn":
+            raise ValueError("Actor/learner training requires the DQN agent")
+        from training.actor_learner import ActorLearner
+        learner_seed = None if seed is None else seed + 3
+        with ActorLearner(agentA, agentB, num_actors=actors, envs_per_actor=envs_per_actor,
+                          capacity=buffer_size, seed=learner_seed, dqn_config=dqn_config) as learner:
+            for ep, metrics in enumerate(learner.episodes(episodes)):
+                record_episode(ep, *metrics)
+            stats = learner.throughput()
+        print(f"[Actor/learner] actors: {stats['actor_env_steps_per_sec']:.0f} env steps/s, "
+              f"learner: {stats['learner_grad_steps_per_sec']:.0f} grad steps/s "
+              f"({stats['learner_samples_per_sec']:.0f} samples/s), "
+              f"{stats['weight_versions']} weight versions, mean policy lag {stats['mean_policy_lag']:.2f}")
+    elif num_envs > 1:
+        # Q-learning sobre N mundos vectorizados: acciones y actualizaciones por lotes
+        if agent_type != "q":
+            raise ValueError("Vectorized training (--num-envs) requires the Q-learning agent")
+        from environment.vec_intersection_env import VecIntersectionEnv
+        vec_env = VecIntersectionEnv(num_envs, seed=seed)
+        states = vec_env.reset()
+        ep_rewards = np.zeros(num_envs)
+        queue_sums = np.zeros(num_envs)
+        ep = 0
+        while ep < episodes:
+            actions = np.stack([agentA.get_actions(states[:, :state_size]),
+                                agentB.get_actions(states[:, state_size:])], axis=1)
+            next_states, step_rewards, dones, infos = vec_env.step(actions)
+            # Los mundos terminados ya se reiniciaron; su transición usa la observación terminal
+            terminal = next_states.copy()
+            for n in np.flatnonzero(dones):
+                terminal[n] = infos[n]["terminal_observation"]
+            agentA.update_batch(states[:, :state_size], actions[:, 0], step_rewards / 2, terminal[:, :state_size])
+            agentB.update_batch(states[:, state_size:], actions[:, 1], step_rewards / 2, terminal[:, state_size:])
+
+            # Colas tras el paso, como en el bucle serie (las del estado terminal si se reinició)
+            step_queues = vec_env.queues.reshape(num_envs, -1).mean(axis=1)
+            for n in np.flatnonzero(dones):
+                step_queues[n] = infos[n]["terminal_queues"].mean()
+            queue_sums += step_queues
+            ep_rewards += step_rewards
+            for n in np.flatnonzero(dones):
+                if ep < episodes:
+                    record_episode(ep, ep_rewards[n], queue_sums[n] / vec_env.max_steps,
+                                   infos[n]["pedestrians_served"], infos[n]["avg_ped_wait"])
+                    ep += 1
+                ep_rewards[n] = 0.0
+                queue_sums[n] = 0.0
+            states = next_states
+    elif workers > 1:
+        from training.rollout_collector import RolloutCollector
+        worker_seed = None if seed is None else seed + 3
+        with RolloutCollector(agent_type, workers, sync_every=sync_every, seed=worker_seed,
+                              dqn_config=dqn_config) as collector:
+            for ep, (block, metrics) in enumerate(collector.episodes(agentA, agentB, episodes)):
+                for t in range(block.num_steps):
+                    learn_step(agent_type, agentA, agentB, block.states[t], block.actions[t],
+                               block.rewards[t], block.next_states[t], block.dones[t])
+                record_episode(ep, *metrics)
+    else:
+        for ep in range(start, episodes):
+            full_state = env.reset()
+            total_reward = 0
+            queue_sum = 0
+            steps = 0
+
+            for t in range(200):
+                if policy is None:
+                    stateA = split_state(full_state, 0)
+                    stateB = split_state(full_state, 1)
+
+                    actionA = agentA.get_action(stateA)
+                    actionB = agentB.get_action(stateB)
+                    actions = [actionA, actionB]
+                else:
+                    actions = policy.get_actions(full_state).tolist()
+
+                next_state, reward, done, _ = env.step(actions)
+                learn_step(agent_type, agentA, agentB, full_state, actions, reward, next_state, done)
+
+                full_state = next_state
+                total_reward += reward
+                queue = np.mean(env.queues)
+                queue_sum += queue
+                step_log.add(ep + 1, t, reward, queue)
+                steps += 1
+
+            served, avg_wait = env.get_pedestrian_metrics()
+            record_episode(ep, total_reward, queue_sum / steps, served, avg_wait)
+            if flush_every and (ep + 1) % flush_every == 0:
+                step_log.flush()
+
+            if checkpoint_every and ((ep + 1) % checkpoint_every == 0 or ep + 1 == episodes):
+                # Las métricas se vuelcan antes para que el archivo llegue justo hasta el checkpoint
+                step_log.flush()
+                episode_log.flush()
+                save_checkpoint(checkpoint_dir, ep + 1, env, [agentA, agentB], policy)
+
     # Guardar agentes entrenados en la carpeta models
     if agent_type == "q":
         agentA.save("models/agentA_q.pkl")
@@ -79,30 +197,84 @@ def train_multi_agent(agent_type="q", episodes=100):
     elif agent_type == "dqn":
         agentA.save("models/agentA_dqn.pth")
         agentB.save("models/agentB_dqn.pth")
+        # Pesos para el backend NumPy de evaluación (test_agent.py --backend numpy)
+        agentA.export("models/agentA_dqn.npz")
+        agentB.export("models/agentB_dqn.npz")
 
-    # Save results
-    with open("training_metrics.csv", mode="w", newline="") as f:
-        writer = csv.writer(f)
-        writer.writerow(["Episode", "TotalReward", "AvgVehicleQueue", "PedestriansServed", "AvgPedestrianWait"])
-        for i in range(episodes):
-            writer.writerow([i+1, rewards[i], avg_queues[i], ped_served_list[i], ped_wait_list[i]])
-
+    episode_log.close()
+    if step_log is not None:
+        step_log.close()
     return rewards
 
-def plot_rewards(rewards, label):
+def plot_rewards(rewards, label, path=None):
+    # path: guarda la figura en ese archivo (backend Agg, sin ventana) en vez de mostrarla
+    plt = pyplot(to_file=path is not None)
     plt.plot(rewards, label=label)
     plt.xlabel('Episode')
     plt.ylabel('Total Reward')
     plt.title('Multi-Agent Learning Performance')
     plt.legend()
     plt.grid(True)
-    plt.show()
+    if path is None:
+        plt.show()
+    else:
+        plt.savefig(path)
+        print(f"Saved {path}")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--agent", choices=["q", "dqn"], required=True)
     parser.add_argument("--episodes", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=1, help="Rollout worker processes (1 = serial)")
+    parser.add_argument("--sync-every", type=int, default=5, help="Broadcast policy weights every M episodes")
+    parser.add_argument("--buffer-size", type=int, default=10000, help="DQN replay memory capacity")
+    parser.add_argument("--per", action="store_true", help="Use prioritized experience replay (DQN only)")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for a reproducible run")
+    parser.add_argument("--target-update", choices=["hard", "soft"], default="hard",
+                        help="DQN target network update: hard copy or Polyak averaging")
+    parser.add_argument("--target-sync-every", type=int, default=500, help="Train steps between hard target syncs")
+    parser.add_argument("--tau", type=float, default=0.005, help="Polyak coefficient for soft target updates")
+    parser.add_argument("--no-double", dest="double", action="store_false", help="Disable Double DQN targets")
+    parser.add_argument("--dueling", action="store_true", help="Dueling Q head (value + advantage streams)")
+    parser.add_argument("--batch-size", type=int, default=32, help="DQN minibatch size")
+    parser.add_argument("--updates-per-step", type=int, default=1, help="DQN gradient updates per env step")
+    parser.add_argument("--amp", action="store_true", help="bfloat16 autocast for the DQN loss")
+    parser.add_argument("--compile", action="store_true", help="torch.compile the DQN loss")
+    parser.add_argument("--num-envs", type=int, default=1,
+                        help="Vectorized worlds for batched Q-learning updates (1 = serial)")
+    parser.add_argument("--actors", type=int, default=0,
+                        help="Actor processes for decoupled actor/learner DQN training (0 = off)")
+    parser.add_argument("--envs-per-actor", type=int, default=8, help="Vectorized worlds per actor process")
+    parser.add_argument("--metrics", default="training_metrics.csv",
+                        help="Per-episode metrics file (.csv, or .arrow for Arrow IPC with pyarrow)")
+    parser.add_argument("--step-metrics", default="training_steps.csv", help="Per-step-window aggregates file")
+    parser.add_argument("--flush-every", type=int, default=10, help="Episodes between metric flushes")
+    parser.add_argument("--checkpoint-every", type=int, default=0,
+                        help="Episodes between training checkpoints (0 = off, serial training only)")
+    parser.add_argument("--checkpoint-dir", default="checkpoints", help="Directory for training checkpoints")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue from the latest checkpoint in --checkpoint-dir (same flags and --seed)")
+    parser.add_argument("--torch-threads", type=int, default=None,
+                        help="Learner intra-op threads (default: physical cores minus rollout workers)")
+    parser.add_argument("--plot", default=None,
+                        help="Save the reward plot to this file (headless) instead of opening a window")
+    parser.add_argument("--no-plot", action="store_true", help="Skip the reward plot")
     args = parser.parse_args()
 
-    rewards = train_multi_agent(agent_type=args.agent, episodes=args.episodes)
-    plot_rewards(rewards, label=f"{args.agent.upper()} (A & B)")
+    if args.agent == "dqn":
+        from agents.dqn_agent import configure_torch_threads
+        configure_torch_threads(args.torch_threads, workers=max(args.actors, args.workers if args.workers > 1 else 0))
+    dqn_config = {"target_update": args.target_update, "target_sync_every": args.target_sync_every,
+                  "tau": args.tau, "double": args.double, "dueling": args.dueling,
+                  "batch_size": args.batch_size, "updates_per_step": args.updates_per_step,
+                  "amp": args.amp, "compile_loss": args.compile}
+    rewards = train_multi_agent(agent_type=args.agent, episodes=args.episodes,
+                                workers=args.workers, sync_every=args.sync_every,
+                                buffer_size=args.buffer_size, per=args.per, seed=args.seed,
+                                dqn_config=dqn_config, actors=args.actors, envs_per_actor=args.envs_per_actor,
+                                num_envs=args.num_envs, metrics_path=args.metrics,
+                                steps_path=args.step_metrics, flush_every=args.flush_every,
+                                checkpoint_dir=args.checkpoint_dir, checkpoint_every=args.checkpoint_every,
+                                resume=args.resume)
+    if not args.no_plot:
+        plot_rewards(rewards, label=f"{args.agent.upper()} (A & B)", path=args.plot)
@@ -1,9 +1,14 @@
-import pandas as pd
-import matplotlib.pyplot as plt
+import os
 import sys
 
+from plotting import pyplot
+from training.metrics_writer import read_metrics
+
 def plot_metrics(csv_file, label_prefix=""):
-    data = pd.read_csv(csv_file)
+    # Acepta el CSV o el stream Arrow de MetricsWriter, también mientras el entrenamiento escribe
+    data = read_metrics(csv_file)
+    plt = pyplot(to_file=True)  # solo escribe PNG: backend Agg, sin ventana
+    os.makedirs("plots", exist_ok=True)
 
     episodes = data["Episode"]
     rewards = data["TotalReward"]
@@ -61,7 +66,7 @@ def plot_metrics(csv_file, label_prefix=""):
 
 if __name__ == "__main__":
     if len(sys.argv) < 3:
-        print("Usage: python plot_metrics.py training_metrics.csv [q|dqn]")
+        print("Usage: python plot_metrics.py training_metrics.csv|training_metrics.arrow [q|dqn]")
     else:
         csv_path = sys.argv[1]
         label = sys.argv[2].upper()
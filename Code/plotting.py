@@ -0,0 +1,8 @@
+# matplotlib se importa solo al dibujar. Con to_file se usa Agg: no hace falta pantalla y no se
+# carga ningún toolkit gráfico (evaluaciones y entrenamientos por lotes en servidores)
+def pyplot(to_file=False):
+    import matplotlib
+    if to_file:
+        matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    return plt
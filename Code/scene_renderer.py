@@ -0,0 +1,184 @@
+import math
+
+import numpy as np
+import pygame
+
+WIDTH, HEIGHT = 900, 600
+INTERSECTION_SIZE = 120
+WHITE = (255, 255, 255)
+GRAY = (120, 120, 120)
+GREEN = (60, 220, 60)
+RED = (220, 60, 60)
+BLACK = (20, 20, 20)
+BLUE = (40, 90, 255)
+CROSSING_BLUE = (0, 180, 255)
+PED_COLOR = (255, 120, 120)
+BG_COLOR = (230, 235, 240)
+ROAD_COLOR = (40, 40, 40)
+
+GRID_SPACING = 300  # distancia entre intersecciones cuando hay más de dos
+TEXT_HEIGHT = 120  # franja superior reservada para el texto de métricas
+MAX_QUEUE_SPRITES = 40  # más coches en cola no caben en pantalla
+VEHICLE_CROSSING_TIME = 2
+
+
+def layout(num_intersections):
+    # Esquina superior izquierda de cada intersección y tamaño de la ventana. Con dos, la
+    # disposición de siempre (A abajo, B arriba); con más, una rejilla
+    if num_intersections == 2:
+        x = WIDTH // 2 - INTERSECTION_SIZE // 2
+        return [(x, HEIGHT // 2 + 100), (x, HEIGHT // 2 - 200)], (WIDTH, HEIGHT)
+    cols = math.ceil(math.sqrt(num_intersections))
+    rows = math.ceil(num_intersections / cols)
+    width = max(WIDTH, cols * GRID_SPACING)
+    height = TEXT_HEIGHT + rows * GRID_SPACING
+    left = (width - cols * GRID_SPACING) // 2 + GRID_SPACING // 2 - INTERSECTION_SIZE // 2
+    top = TEXT_HEIGHT + GRID_SPACING // 2 - INTERSECTION_SIZE // 2
+    positions = [(left + (i % cols) * GRID_SPACING, top + (i // cols) * GRID_SPACING)
+                 for i in range(num_intersections)]
+    return positions, (width, height)
+
+
+def draw_static(surface, positions, font):
+    # Lo que no cambia entre pasos: fondo, calles, intersecciones, etiquetas y pasos de peatones
+    surface.fill(BG_COLOR)
+    width, height = surface.get_size()
+    for x, y in positions:
+        pygame.draw.rect(surface, ROAD_COLOR, (x, 0, INTERSECTION_SIZE, height))
+        pygame.draw.rect(surface, ROAD_COLOR, (0, y, width, INTERSECTION_SIZE))
+
+    step = 8
+    for i, (x, y) in enumerate(positions):
+        pygame.draw.rect(surface, GRAY, (x, y, INTERSECTION_SIZE, INTERSECTION_SIZE), border_radius=12)
+        surface.blit(font.render(chr(ord("A") + i), True, WHITE), (x + 5, y + 5))
+        for j in range(0, INTERSECTION_SIZE, step * 2):
+            pygame.draw.line(surface, WHITE, (x + j, y - 10), (x + j + step, y - 10), 2)
+            pygame.draw.line(surface, WHITE, (x + j, y + INTERSECTION_SIZE + 10),
+                             (x + j + step, y + INTERSECTION_SIZE + 10), 2)
+            pygame.draw.line(surface, WHITE, (x - 10, y + j), (x - 10, y + j + step), 2)
+            pygame.draw.line(surface, WHITE, (x + INTERSECTION_SIZE + 10, y + j),
+                             (x + INTERSECTION_SIZE + 10, y + j + step), 2)
+
+
+def draw_dynamic(surface, x, y, phase, queues, ped_requests, ped_cross_timer, vehicle_cross_timer):
+    # Semáforos, coches (en cola y cruzando) y peatones de una intersección; devuelve los
+    # rectángulos tocados
+    size = INTERSECTION_SIZE
+    rects = []
+    ns_color = GREEN if phase == 0 else RED
+    ew_color = GREEN if phase == 1 else RED
+    rects.append(pygame.draw.circle(surface, ns_color, (x + size // 2 - 50, y - 15), 8))
+    rects.append(pygame.draw.circle(surface, ns_color, (x + size // 2 + 50, y + size + 15), 8))
+    rects.append(pygame.draw.circle(surface, ew_color, (x + size + 15, y + size // 2 - 50), 8))
+    rects.append(pygame.draw.circle(surface, ew_color, (x - 15, y + size // 2 + 50), 8))
+
+    # Colas (N=0, E=1, S=2, W=3)
+    for d in range(4):
+        for q in range(min(int(queues[d]), MAX_QUEUE_SPRITES)):
+            if d == 0:
+                px, py = x + size // 2 - 16, y - 28 - q * 16
+            elif d == 1:
+                px, py = x + size + 12 + q * 16, y + size // 2 - 16
+            elif d == 2:
+                px, py = x + size // 2 + 16, y + size + 12 + q * 16
+            else:
+                px, py = x - 28 - q * 16, y + size // 2 + 16
+            rects.append(pygame.draw.rect(surface, BLUE, (px, py, 12, 12), border_radius=3))
+
+    # Coches cruzando: de la entrada al centro según el temporizador
+    center = (x + size // 2 - 6, y + size // 2 - 6)
+    entries = [(x + size // 2 - 6, y - 28), (x + size + 12, y + size // 2 - 6),
+               (x + size // 2 - 6, y + size + 12), (x - 28, y + size // 2 - 6)]
+    for d in range(4):
+        if vehicle_cross_timer[d] > 0:
+            progress = 1 - vehicle_cross_timer[d] / VEHICLE_CROSSING_TIME
+            (sx, sy), (ex, ey) = entries[d], center
+            rect = (int(sx + (ex - sx) * progress), int(sy + (ey - sy) * progress), 14, 14)
+            rects.append(pygame.draw.rect(surface, CROSSING_BLUE, rect, border_radius=4))
+
+    waiting = [(x + size // 2, y - 30), (x + size + 30, y + size // 2),
+               (x + size // 2, y + size + 30), (x - 30, y + size // 2)]
+    crossing = [(x + size // 2, y + 10), (x + size - 10, y + size // 2),
+                (x + size // 2, y + size - 10), (x + 10, y + size // 2)]
+    for d in range(4):
+        if ped_requests[d]:
+            rects.append(pygame.draw.circle(surface, PED_COLOR, waiting[d], 8))
+        if ped_cross_timer[d] > 0:
+            rects.append(pygame.draw.circle(surface, PED_COLOR, crossing[d], 10, 2))
+    return [rect for rect in rects if rect.width and rect.height]
+
+
+class SceneRenderer:
+    # Render incremental: el fondo estático se dibuja una vez en una Surface cacheada y en cada
+    # frame solo se repintan las capas (una por intersección, más el texto) cuyo estado cambió.
+    # Sus rectángulos del frame anterior se restauran desde el fondo y solo esas zonas se envían
+    # a la pantalla con display.update(rects). Una capa sin cambios se repinta igualmente si se
+    # solapa con algo borrado o pintado en este frame, para respetar el orden de dibujo.
+    def __init__(self, screen, positions, font=None, font_big=None):
+        self.screen = screen
+        self.positions = positions
+        self.font = font or pygame.font.SysFont(None, 20)
+        self.font_big = font_big or pygame.font.SysFont(None, 28)
+        self.background = pygame.Surface(screen.get_size()).convert()
+        draw_static(self.background, positions, self.font)
+        self.invalidate()
+
+    def invalidate(self):
+        # Fuerza un frame completo (primer frame, ventana expuesta o redimensionada...)
+        self.screen.blit(self.background, (0, 0))
+        self._keys = [None] * (len(self.positions) + 1)
+        self._rects = [[] for _ in self._keys]
+        self._full = True
+
+    def _layers(self, env, lines):
+        layers = []
+        for i, (x, y) in enumerate(self.positions):
+            state = (int(np.argmax(env.signals[i])), env.queues[i], env.ped_requests[i],
+                     env.ped_timers[i], env.signal_timer[i])
+            key = (state[0],) + tuple(a.tobytes() for a in state[1:])
+            layers.append((key, lambda x=x, y=y, state=state: draw_dynamic(self.screen, x, y, *state)))
+        layers.append((tuple(lines), lambda: self._draw_text(lines)))
+        return layers
+
+    def _draw_text(self, lines):
+        return [self.screen.blit(self.font_big.render(line, True, BLACK), (30, 20 + 30 * k))
+                for k, line in enumerate(lines)]
+
+    def draw(self, env, lines=()):
+        # Dibuja el estado actual del entorno y las líneas de texto; devuelve los rectángulos enviados
+        layers = self._layers(env, lines)
+        erased = []
+        for i, (key, _) in enumerate(layers):
+            if key != self._keys[i]:
+                for rect in self._rects[i]:
+                    self.screen.blit(self.background, rect, rect)
+                erased += self._rects[i]
+
+        painted = []
+        for i, (key, paint) in enumerate(layers):
+            touched = erased + painted
+            if key != self._keys[i] or any(rect.collidelist(touched) >= 0 for rect in self._rects[i]):
+                self._rects[i] = paint()
+                self._keys[i] = key
+                painted += self._rects[i]
+
+        if self._full:
+            pygame.display.flip()
+            self._full = False
+            return [self.screen.get_rect()]
+        dirty = erased + painted
+        if dirty:
+            pygame.display.update(dirty)
+        return dirty
+
+    def redraw(self, env, lines=()):
+        # Frame completo a la antigua (fondo, capas y flip); sirve de referencia en render_bench
+        self.screen.fill(BG_COLOR)
+        draw_static(self.screen, self.positions, self.font)
+        for i, (x, y) in enumerate(self.positions):
+            draw_dynamic(self.screen, x, y, int(np.argmax(env.signals[i])), env.queues[i],
+                         env.ped_requests[i], env.ped_timers[i], env.signal_timer[i])
+        self._draw_text(lines)
+        pygame.display.flip()
+        self.invalidate()
+        self._full = False
@@ -0,0 +1,306 @@
+# Servicio de inferencia: carga los agentes una vez y responde "observación -> fases" por un
+# socket local (TCP o Unix). Protocolo binario sin cabeceras: cada petición es el estado completo
+# del entorno en float32 (state_size valores) y cada respuesta, una acción int32 por agente, en el
+# mismo orden en que llegaron las peticiones de esa conexión.
+# Uso (desde Code/): python -m serving.policy_server --agent dqn --port 5555
+# torch solo se importa al servir la DQN
+import argparse
+import os
+import selectors
+import socket
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from environment.intersection_env import IntersectionEnv
+from evaluation.evaluator import MODEL_PATHS, load_policy
+
+NUM_AGENTS = 2
+
+
+def load_greedy(agent_type, paths=None):
+    # Función (N, state_size) float32 -> (N, NUM_AGENTS) acciones, sin exploración
+    policy = load_policy(agent_type, paths=paths)
+    for agent in policy.agents:
+        agent.epsilon = 0.0
+    if policy.multi_policy is None:
+        half = policy.agents[0].state_size
+        return lambda states: np.stack([agent.get_actions(states[:, k * half:(k + 1) * half])
+                                        for k, agent in enumerate(policy.agents)], axis=1)
+
+    import torch
+    multi = policy.multi_policy
+    def select(states):
+        with torch.no_grad():
+            return multi.q_values(states.reshape(len(states), NUM_AGENTS, -1)).argmax(dim=2).cpu().numpy()
+    return select
+
+
+def _make_socket(address):
+    # address: (host, port) para TCP o una ruta para un socket Unix
+    if isinstance(address, str):
+        return socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    return sock
+
+
+class _Connection:
+    # Estado de una conexión: bytes de una petición a medio llegar y respuestas pendientes de
+    # enviar. replies guarda (bytes encolados al terminar la respuesta, llegada, filas) para medir
+    # la latencia cuando la respuesta sale entera
+    def __init__(self, sock):
+        self.sock = sock
+        self.inbuf = bytearray()
+        self.outbuf = bytearray()
+        self.replies = deque()
+        self.queued = 0
+        self.sent = 0
+        self.closed = False
+
+
+class PolicyServer:
+    # Un único hilo de E/S con selectors: lee todo lo que haya llegado de todas las conexiones,
+    # lo resuelve en una sola pasada por la red (batching dinámico) y responde. Un hilo aparte
+    # vigila los archivos del modelo y cambia la función de inferencia entre lotes, así que una
+    # recarga no descarta ni retrasa peticiones más allá de un lote.
+    def __init__(self, agent_type="dqn", address=("127.0.0.1", 5555), paths=None, max_batch=256,
+                 max_wait=0.0, reload_every=1.0):
+        self.agent_type = agent_type
+        self.address = address
+        self.paths = tuple(paths or MODEL_PATHS[agent_type])
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.reload_every = reload_every
+        self.state_size = IntersectionEnv().state_size
+        self.frame = self.state_size * 4
+
+        self.version = 0
+        self._mtimes = None
+        self._select = None
+        self.reload()
+        self.requests = 0
+        self.batches = 0
+        self.latencies = deque(maxlen=100000)  # segundos desde que se lee la petición hasta enviar la respuesta
+        self._stop = threading.Event()
+
+    def reload(self):
+        # Carga los modelos si cambiaron en disco; devuelve True si hubo cambio
+        mtimes = [os.stat(path).st_mtime_ns for path in self.paths]
+        if mtimes == self._mtimes:
+            return False
+        self._select = load_greedy(self.agent_type, self.paths)
+        self._mtimes = mtimes
+        self.version += 1
+        return True
+
+    def _watch(self):
+        while not self._stop.wait(self.reload_every):
+            try:
+                if self.reload():
+                    print(f"[server] Reloaded {self.agent_type} models (version {self.version})")
+            except Exception as exc:
+                # Checkpoint a medio escribir: se sigue con el modelo anterior y se reintenta
+                print(f"[server] Reload failed, keeping version {self.version}: {exc}")
+
+    def _read(self, sel, listener, timeout, pending):
+        now = time.perf_counter()
+        for key, mask in sel.select(timeout):
+            if key.fileobj is listener:
+                conn, _ = listener.accept()
+                conn.setblocking(False)
+                sel.register(conn, selectors.EVENT_READ, _Connection(conn))
+                continue
+            state = key.data
+            if mask & selectors.EVENT_WRITE:
+                self._flush(sel, state)
+            if not mask & selectors.EVENT_READ or state.closed:
+                continue
+            try:
+                chunk = state.sock.recv(1 << 16)
+            except BlockingIOError:
+                continue
+            except OSError:
+                chunk = b""
+            if not chunk:
+                self._close(sel, state)
+                continue
+            buf = state.inbuf
+            buf += chunk
+            n = len(buf) // self.frame
+            if n:
+                pending.append((state, bytes(buf[:n * self.frame]), now))
+                del buf[:n * self.frame]
+
+    def _answer(self, sel, pending):
+        states = np.frombuffer(bytearray().join(data for _, data, _ in pending), dtype=np.float32)
+        states = states.reshape(-1, self.state_size)
+        select = self._select
+        actions = np.concatenate([select(states[i:i + self.max_batch])
+                                  for i in range(0, len(states), self.max_batch)]).astype(np.int32)
+        self.batches += 1
+        self.requests += len(states)
+
+        row = 0
+        for state, data, received in pending:
+            n = len(data) // self.frame
+            if not state.closed:
+                reply = actions[row:row + n].tobytes()
+                state.outbuf += reply
+                state.queued += len(reply)
+                state.replies.append((state.queued, received, n))
+                self._flush(sel, state)
+            row += n
+
+    def _flush(self, sel, state):
+        # Envía lo que admita el socket; si queda algo se espera a EVENT_WRITE, así que una
+        # respuesta grande nunca se corta ni desordena las siguientes de esa conexión
+        try:
+            while state.outbuf:
+                sent = state.sock.send(state.outbuf)
+                del state.outbuf[:sent]
+                state.sent += sent
+        except BlockingIOError:
+            pass
+        except (ConnectionResetError, BrokenPipeError):
+            self._close(sel, state)
+            return
+        now = time.perf_counter()
+        while state.replies and state.replies[0][0] <= state.sent:
+            _, received, n = state.replies.popleft()
+            self.latencies.extend([now - received] * n)
+        events = selectors.EVENT_READ | (selectors.EVENT_WRITE if state.outbuf else 0)
+        if sel.get_key(state.sock).events != events:
+            sel.modify(state.sock, events, state)
+
+    def _close(self, sel, state):
+        state.closed = True
+        sel.unregister(state.sock)
+        state.sock.close()
+
+    def serve_forever(self, ready=None):
+        listener = _make_socket(self.address)
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.unlink(self.address)
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        listener.bind(self.address)
+        listener.listen(128)
+        listener.setblocking(False)
+        sel = selectors.DefaultSelector()
+        sel.register(listener, selectors.EVENT_READ, None)
+        watcher = threading.Thread(target=self._watch, daemon=True)
+        watcher.start()
+        if ready is not None:
+            ready.set()
+        try:
+            while not self._stop.is_set():
+                pending = []
+                self._read(sel, listener, 0.1, pending)
+                # Ventana de batching opcional: se espera hasta max_wait a que lleguen más peticiones
+                deadline = time.perf_counter() + self.max_wait
+                while pending and sum(len(d) for _, d, _ in pending) < self.max_batch * self.frame:
+                    left = deadline - time.perf_counter()
+                    if left <= 0:
+                        break
+                    self._read(sel, listener, left, pending)
+                if pending:
+                    self._answer(sel, pending)
+        finally:
+            self._stop.set()
+            for key in list(sel.get_map().values()):
+                key.fileobj.close()
+            sel.close()
+            if isinstance(self.address, str):
+                os.unlink(self.address)
+
+    def shutdown(self):
+        self._stop.set()
+
+    def stats(self):
+        latencies = np.array(self.latencies) * 1e6
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "mean_batch": self.requests / max(self.batches, 1),
+            "p50_us": float(np.percentile(latencies, 50)) if len(latencies) else 0.0,
+            "p99_us": float(np.percentile(latencies, 99)) if len(latencies) else 0.0,
+            "version": self.version,
+        }
+
+
+class PolicyClient:
+    # Cliente bloqueante: act(estado) -> acciones, o un lote (N, state_size) -> (N, NUM_AGENTS)
+    def __init__(self, address=("127.0.0.1", 5555), state_size=None):
+        self.state_size = state_size or IntersectionEnv().state_size
+        self.sock = _make_socket(address)
+        self.sock.connect(address)
+
+    def send(self, states):
+        self.sock.sendall(np.ascontiguousarray(states, dtype=np.float32).tobytes())
+
+    def receive(self, n):
+        size = n * NUM_AGENTS * 4
+        buf = bytearray(size)
+        view = memoryview(buf)
+        got = 0
+        while got < size:
+            k = self.sock.recv_into(view[got:])
+            if not k:
+                raise ConnectionError("Policy server closed the connection")
+            got += k
+        return np.frombuffer(buf, dtype=np.int32).reshape(n, NUM_AGENTS)
+
+    def act(self, states):
+        states = np.asarray(states, dtype=np.float32)
+        batched = states.ndim == 2
+        self.send(states)
+        actions = self.receive(len(states) if batched else 1)
+        return actions if batched else actions[0]
+
+    def close(self):
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def parse_address(host, port, unix=None):
+    return unix if unix else (host, port)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--agent", choices=["q", "dqn"], default="dqn")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5555)
+    parser.add_argument("--unix", default=None, help="Serve on this Unix socket path instead of TCP")
+    parser.add_argument("--max-batch", type=int, default=256, help="Rows per forward pass")
+    parser.add_argument("--max-wait", type=float, default=0.0,
+                        help="Seconds to wait for more requests before a forward pass (0 = batch what is ready)")
+    parser.add_argument("--reload-every", type=float, default=1.0, help="Seconds between model file checks")
+    parser.add_argument("--report-every", type=float, default=10.0, help="Seconds between latency reports")
+    parser.add_argument("--threads", type=int, default=1, help="torch intra-op threads (DQN only)")
+    args = parser.parse_args()
+    if args.agent == "dqn":
+        import torch
+        torch.set_num_threads(args.threads)
+
+    server = PolicyServer(args.agent, parse_address(args.host, args.port, args.unix), max_batch=args.max_batch,
+                          max_wait=args.max_wait, reload_every=args.reload_every)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    print(f"[server] Serving {args.agent} on {server.address}")
+    try:
+        while thread.is_alive():
+            thread.join(args.report_every)
+            s = server.stats()
+            print(f"[server] {s['requests']} requests, mean batch {s['mean_batch']:.1f}, "
+                  f"p50 {s['p50_us']:.0f} us, p99 {s['p99_us']:.0f} us, model version {s['version']}")
+    except KeyboardInterrupt:
+        server.shutdown()
+        thread.join()
@@ -0,0 +1,267 @@
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import queue
+import random
+import time
+
+import numpy as np
+import torch
+from torch.nn.utils import parameters_to_vector, vector_to_parameters
+
+from agents.replay_buffer import ReplayBuffer
+from environment.vec_intersection_env import VecIntersectionEnv
+from training.rollout_collector import ACTION_SIZE, NUM_AGENTS, _check_alive, _make_agents
+
+
+def _shared_fields(num_actors, segment, state_dim, num_params):
+    # Una memoria de repetición por agente, dividida en un segmento por actor (un único escritor
+    # por segmento), más los contadores de escritura y los pesos publicados por el learner
+    fields = []
+    for k in range(NUM_AGENTS):
+        fields += [
+            (f"states{k}", np.float32, (num_actors * segment, state_dim)),
+            (f"actions{k}", np.int64, (num_actors * segment,)),
+            (f"rewards{k}", np.float32, (num_actors * segment,)),
+            (f"next_states{k}", np.float32, (num_actors * segment, state_dim)),
+            (f"dones{k}", np.float32, (num_actors * segment,)),
+        ]
+    fields += [
+        ("written", np.int64, (num_actors,)),  # transiciones escritas por cada actor (monótono)
+        ("version", np.int64, (1,)),  # seqlock: impar mientras el learner escribe los pesos
+        ("stop", np.int64, (1,)),
+        ("weights", np.float32, (num_params,)),
+    ]
+    return fields
+
+
+def _fields_nbytes(fields):
+    return sum((int(np.prod(shape)) * np.dtype(dtype).itemsize + 7) // 8 * 8 for _, dtype, shape in fields)
+
+
+class SharedArrays:
+    # Vistas NumPy sobre la memoria compartida, una por campo
+    def __init__(self, buf, fields):
+        offset = 0
+        for name, dtype, shape in fields:
+            setattr(self, name, np.ndarray(shape, dtype=dtype, buffer=buf, offset=offset))
+            offset += (int(np.prod(shape)) * np.dtype(dtype).itemsize + 7) // 8 * 8
+
+
+class SharedReplayBuffer(ReplayBuffer):
+    # ReplayBuffer del learner sobre la memoria compartida: solo lee. Los actores escriben sin
+    # bloqueo, así que una muestra puede coincidir con un hueco que se está sobrescribiendo.
+    def __init__(self, arrays, agent_id, num_actors, segment, state_dim, device="cpu", seed=None):
+        super().__init__(0, state_dim, device, seed)
+        self.capacity = num_actors * segment
+        self.segment = segment
+        self.written = arrays.written
+        self.states = getattr(arrays, f"states{agent_id}")
+        self.actions = getattr(arrays, f"actions{agent_id}")
+        self.rewards = getattr(arrays, f"rewards{agent_id}")
+        self.next_states = getattr(arrays, f"next_states{agent_id}")
+        self.dones = getattr(arrays, f"dones{agent_id}")
+
+    def __len__(self):
+        return int(np.minimum(self.written, self.segment).sum())
+
+    def add(self, s, a, r, s_next, done=False):
+        raise TypeError("SharedReplayBuffer is filled by the actor processes")
+
+    add_batch = add
+
+    def sample(self, batch_size):
+        filled = np.minimum(self.written, self.segment)
+        ends = np.cumsum(filled)
+        pos = self.rng.integers(0, ends[-1], size=batch_size)
+        actor = np.searchsorted(ends, pos, side="right")
+        idx = actor * self.segment + pos - (ends[actor] - filled[actor])
+        return self.gather(idx)
+
+
+def _actor_loop(actor_id, shm_name, fields, num_envs, segment, seed, dqn_config, poll_every, results):
+    from agents.multi_agent_policy import MultiAgentPolicy
+
+    env = VecIntersectionEnv(num_envs, seed=seed)
+    half = env.state_size // NUM_AGENTS
+    agents = _make_agents("dqn", half, ACTION_SIZE, seed, dqn_config)
+    policy = MultiAgentPolicy(list(agents), seed=seed)
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    arrays = SharedArrays(shm.buf, fields)
+    base = actor_id * segment
+    seen = -1
+    try:
+        states = env.reset()
+        ep_reward = np.zeros(num_envs)
+        queue_sum = np.zeros(num_envs)
+        step = 0
+        while not arrays.stop[0]:
+            if step % poll_every == 0:
+                # Lectura con seqlock: se descarta la copia si el learner publicó mientras tanto
+                version = int(arrays.version[0])
+                if version != seen and version % 2 == 0:
+                    weights = torch.from_numpy(arrays.weights.copy())
+                    if int(arrays.version[0]) == version:
+                        vector_to_parameters(weights, [p for agent in agents for p in agent.model.parameters()])
+                        policy.sync()
+                        seen = version
+
+            actions = policy.get_actions(states)
+            next_states, rewards, dones, infos = env.step(actions)
+            terminal = next_states.copy()
+            for n in np.flatnonzero(dones):
+                terminal[n] = infos[n]["terminal_observation"]
+
+            idx = base + (arrays.written[actor_id] + np.arange(num_envs)) % segment
+            for k in range(NUM_AGENTS):
+                getattr(arrays, f"states{k}")[idx] = states[:, k * half:(k + 1) * half]
+                getattr(arrays, f"actions{k}")[idx] = actions[:, k]
+                getattr(arrays, f"rewards{k}")[idx] = rewards / 2
+                getattr(arrays, f"next_states{k}")[idx] = terminal[:, k * half:(k + 1) * half]
+                getattr(arrays, f"dones{k}")[idx] = dones
+            arrays.written[actor_id] += num_envs  # se publica después de escribir los datos
+
+            # Colas tras el paso, como en el entrenamiento en serie (las del estado terminal si se reinició)
+            step_queues = env.queues.reshape(num_envs, -1).mean(axis=1)
+            for n in np.flatnonzero(dones):
+                step_queues[n] = infos[n]["terminal_queues"].mean()
+            queue_sum += step_queues
+            ep_reward += rewards
+            for n in np.flatnonzero(dones):
+                info = infos[n]
+                results.put((actor_id, seen, ep_reward[n], queue_sum[n] / env.max_steps,
+                             info["pedestrians_served"], info["avg_ped_wait"]))
+                ep_reward[n] = 0.0
+                queue_sum[n] = 0.0
+            states = next_states
+            step += 1
+    finally:
+        del arrays
+        shm.close()
+
+
+class ActorLearner:
+    # Actores en procesos aparte generan experiencia con VecIntersectionEnv y la escriben en una
+    # memoria de repetición compartida; el learner (este proceso) entrena sin esperar al entorno
+    # y publica pesos versionados que los actores recogen cada poll_every pasos.
+    def __init__(self, agentA, agentB, num_actors=2, envs_per_actor=8, capacity=100000,
+                 publish_every=50, poll_every=10, seed=None, dqn_config=None):
+        for agent in (agentA, agentB):
+            if agent.prioritized:
+                raise ValueError("ActorLearner uses a shared uniform replay; prioritized replay is not supported")
+        self.agents = (agentA, agentB)
+        self.num_actors = num_actors
+        self.envs_per_actor = envs_per_actor
+        self.publish_every = publish_every
+        self.segment = max(capacity // num_actors, envs_per_actor)
+
+        state_dim = agentA.memory.state_dim
+        self._params = [p for agent in self.agents for p in agent.model.parameters()]
+        num_params = int(sum(p.numel() for p in self._params))
+        self._fields = _shared_fields(num_actors, self.segment, state_dim, num_params)
+        self._shm = shared_memory.SharedMemory(create=True, size=_fields_nbytes(self._fields))
+        self._arrays = SharedArrays(self._shm.buf, self._fields)
+        self._arrays.written[:] = 0
+        self._arrays.version[0] = 0
+        self._arrays.stop[0] = 0
+        self.publish()
+
+        if seed is None:
+            seed = random.randrange(2**31)
+        for k, agent in enumerate(self.agents):
+            agent.memory = SharedReplayBuffer(self._arrays, k, num_actors, self.segment, state_dim,
+                                              agent.device, seed=seed + k)
+
+        # Cada actor usa seed + 3 * w para sus entornos y los dos siguientes para sus agentes
+        ctx = mp.get_context("spawn")
+        self._results = ctx.Queue()
+        self._actors = [
+            ctx.Process(target=_actor_loop,
+                        args=(w, self._shm.name, self._fields, envs_per_actor, self.segment, seed + 3 * w,
+                              dqn_config, poll_every, self._results),
+                        daemon=True)
+            for w in range(num_actors)
+        ]
+        for p in self._actors:
+            p.start()
+        self._start = time.perf_counter()
+        self.updates = 0
+        self.lags = []
+
+    def publish(self):
+        arrays = self._arrays
+        version = int(arrays.version[0])
+        arrays.version[0] = version + 1
+        with torch.no_grad():
+            arrays.weights[:] = parameters_to_vector(self._params).cpu().numpy()
+        arrays.version[0] = version + 2
+
+    @property
+    def version(self):
+        return int(self._arrays.version[0]) // 2
+
+    def episodes(self, num_episodes):
+        # Entrena de forma continua y va devolviendo las métricas de cada episodio terminado por
+        # los actores: (total_reward, avg_queue, served, avg_wait)
+        agentA, agentB = self.agents
+        done = 0
+        while done < num_episodes:
+            try:
+                while done < num_episodes:
+                    _, seen, *metrics = self._results.get_nowait()
+                    self.lags.append(self.version - seen // 2)
+                    done += 1
+                    yield tuple(metrics)
+            except queue.Empty:
+                _check_alive(self._actors, "Actor")
+            if done >= num_episodes:
+                break
+            if len(agentA.memory) < agentA.batch_size:
+                time.sleep(0.001)
+                continue
+            agentA.train_step()
+            agentB.train_step()
+            self.updates += 1
+            if self.updates % self.publish_every == 0:
+                self.publish()
+
+    def throughput(self):
+        if self._arrays is not None:
+            self._written = int(self._arrays.written.sum())
+            self._end = time.perf_counter()
+        elapsed = self._end - self._start
+        agentA, agentB = self.agents
+        grad_steps = self.updates * (agentA.updates_per_step + agentB.updates_per_step)
+        return {
+            "seconds": elapsed,
+            "actor_env_steps_per_sec": self._written / elapsed,
+            "learner_grad_steps_per_sec": grad_steps / elapsed,
+            "learner_samples_per_sec": grad_steps * agentA.batch_size / elapsed,
+            "weight_versions": self.version,
+            "mean_policy_lag": float(np.mean(self.lags)) if self.lags else 0.0,
+        }
+
+    def close(self):
+        if self._arrays is None:
+            return
+        self.throughput()  # fija los contadores antes de liberar la memoria compartida
+        self._arrays.stop[0] = 1
+        for p in self._actors:
+            p.join(timeout=5)
+            if p.is_alive():
+                p.terminate()
+        # Los agentes no pueden seguir apuntando a la memoria compartida una vez liberada
+        for agent in self.agents:
+            agent.memory = ReplayBuffer(agent.batch_size, agent.memory.state_dim, agent.device)
+        self._arrays = None
+        try:
+            self._shm.close()
+        except BufferError:
+            pass  # aún quedan vistas vivas; el segmento se libera igual
+        self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
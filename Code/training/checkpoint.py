@@ -0,0 +1,137 @@
+import os
+import pickle
+import shutil
+
+import numpy as np
+
+BUFFER_FIELDS = ("states", "actions", "rewards", "next_states", "dones")
+LATEST = "latest"
+
+
+# Un checkpoint es un directorio ep000050/ con state.pkl (episodio, snapshot del entorno, estados
+# de los generadores, tablas Q), un .pt por agente DQN (red, target y Adam) y la memoria de
+# repetición en .npy, que al reanudar se abre con mmap y se copia en los arrays preasignados.
+# Se escribe en ep000050.tmp/ y se renombra; el archivo `latest` apunta al último completo.
+
+def _save_buffer(buffer, path, prefix):
+    for name in BUFFER_FIELDS:
+        np.save(os.path.join(path, f"{prefix}_{name}.npy"), getattr(buffer, name))
+    state = {"position": buffer.position, "size": buffer.size, "rng": buffer.rng.bit_generator.state}
+    if hasattr(buffer, "tree"):  # PrioritizedReplayBuffer
+        np.save(os.path.join(path, f"{prefix}_tree.npy"), buffer.tree.tree)
+        state.update(beta=buffer.beta, max_priority=buffer.max_priority)
+    return state
+
+
+def _load_array(path, out):
+    data = np.load(path, mmap_mode="r")
+    if data.shape != out.shape:
+        raise ValueError(f"{os.path.basename(path)} has shape {data.shape}, expected {out.shape}; "
+                         f"resume with the same --buffer-size")
+    out[...] = data
+
+
+def _load_buffer(buffer, path, prefix, state):
+    for name in BUFFER_FIELDS:
+        _load_array(os.path.join(path, f"{prefix}_{name}.npy"), getattr(buffer, name))
+    buffer.position = state["position"]
+    buffer.size = state["size"]
+    buffer.rng.bit_generator.state = state["rng"]
+    if hasattr(buffer, "tree"):
+        _load_array(os.path.join(path, f"{prefix}_tree.npy"), buffer.tree.tree)
+        buffer.beta = state["beta"]
+        buffer.max_priority = state["max_priority"]
+
+
+def _save_agent(agent, path, prefix):
+    state = {"rng": agent.rng.getstate(), "epsilon": agent.epsilon}
+    if hasattr(agent, "q_table"):
+        state["q_table"] = agent.q_table
+    else:
+        import torch
+        torch.save({"model": agent.model.state_dict(), "target": agent.target_model.state_dict(),
+                    "optimizer": agent.optimizer.state_dict()}, os.path.join(path, f"{prefix}.pt"))
+        state["train_steps"] = agent.train_steps
+        state["memory"] = _save_buffer(agent.memory, path, prefix)
+    return state
+
+
+def _load_agent(agent, path, prefix, state):
+    agent.rng.setstate(state["rng"])
+    agent.epsilon = state["epsilon"]
+    if hasattr(agent, "q_table"):
+        agent.q_table = state["q_table"]
+    else:
+        import torch
+        nets = torch.load(os.path.join(path, f"{prefix}.pt"), map_location=agent.device)
+        agent.model.load_state_dict(nets["model"])
+        agent.target_model.load_state_dict(nets["target"])
+        agent.optimizer.load_state_dict(nets["optimizer"])
+        agent.train_steps = state["train_steps"]
+        _load_buffer(agent.memory, path, prefix, state["memory"])
+
+
+def save_checkpoint(directory, episode, env, agents, policy=None, keep=2):
+    # episode: episodios ya completados. Se conservan los `keep` checkpoints más recientes
+    os.makedirs(directory, exist_ok=True)
+    name = f"ep{episode:06d}"
+    final = os.path.join(directory, name)
+    tmp = final + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    state = {
+        "episode": episode,
+        "env": env.get_snapshot(),
+        "agents": [_save_agent(agent, tmp, f"agent{k}") for k, agent in enumerate(agents)],
+        "policy_rng": None if policy is None else policy.rng.bit_generator.state,
+        "torch_rng": None,
+    }
+    if policy is not None:  # DQN: torch ya está cargado (con Q-learning no se importa)
+        import torch
+        state["torch_rng"] = torch.get_rng_state()
+    with open(os.path.join(tmp, "state.pkl"), "wb") as f:
+        pickle.dump(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+
+    shutil.rmtree(final, ignore_errors=True)
+    os.replace(tmp, final)
+    pointer = os.path.join(directory, LATEST)
+    with open(pointer + ".tmp", "w") as f:
+        f.write(name)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(pointer + ".tmp", pointer)
+
+    # Los posteriores a este episodio son de una ejecución abandonada (se reanudó antes de ellos)
+    done = sorted(d for d in os.listdir(directory) if d.startswith("ep") and not d.endswith(".tmp"))
+    stale = [d for d in done if d > name] + [d for d in done if d <= name][:-keep]
+    for old in stale:
+        shutil.rmtree(os.path.join(directory, old), ignore_errors=True)
+    return final
+
+
+def load_checkpoint(directory, env, agents, policy=None):
+    # Restaura el último checkpoint completo y devuelve cuántos episodios llevaba (None si no hay)
+    pointer = os.path.join(directory, LATEST)
+    if not os.path.exists(pointer):
+        return None
+    with open(pointer) as f:
+        path = os.path.join(directory, f.read().strip())
+    with open(os.path.join(path, "state.pkl"), "rb") as f:
+        state = pickle.load(f)
+
+    if len(state["agents"]) != len(agents) or any(
+            ("q_table" in saved) != hasattr(agent, "q_table") for saved, agent in zip(state["agents"], agents)):
+        raise ValueError(f"Checkpoint {path} was written for a different agent type")
+    env.restore(state["env"])
+    for k, (agent, saved) in enumerate(zip(agents, state["agents"])):
+        _load_agent(agent, path, f"agent{k}", saved)
+    if policy is not None:
+        policy.rng.bit_generator.state = state["policy_rng"]
+        policy.sync()
+    if state["torch_rng"] is not None:
+        import torch
+        torch.set_rng_state(state["torch_rng"])
+    return state["episode"]
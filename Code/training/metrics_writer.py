@@ -0,0 +1,159 @@
+import csv
+import os
+
+EPISODE_COLUMNS = ["Episode", "TotalReward", "AvgVehicleQueue", "PedestriansServed", "AvgPedestrianWait"]
+STEP_COLUMNS = ["Episode", "StepStart", "StepEnd", "MeanReward", "MinReward", "MaxReward", "MeanQueue", "MaxQueue"]
+
+
+def _is_arrow(path):
+    return os.path.splitext(path)[1].lower() in (".arrow", ".arrows", ".ipc")
+
+
+class MetricsWriter:
+    # Sink append-only: las filas se acumulan en memoria y se vuelcan al archivo cada flush_every
+    # filas (y al cerrar), así que el archivo se puede leer mientras el entrenamiento sigue.
+    # .arrow/.arrows/.ipc escribe un stream Arrow IPC (requiere pyarrow); cualquier otra
+    # extensión, CSV. append=True continúa un archivo existente (el CSV no repite la cabecera).
+    def __init__(self, path, columns, flush_every=10, append=False):
+        self.path = path
+        self.columns = list(columns)
+        self.flush_every = flush_every
+        self._rows = []
+        self.rows_written = 0
+
+        if _is_arrow(path):
+            try:
+                import pyarrow as pa
+            except ImportError as exc:
+                raise ImportError("Arrow metrics files require pyarrow; use a .csv path instead") from exc
+            if append:
+                raise ValueError("Arrow IPC streams cannot be appended to; use a .csv path to resume")
+            self._pa = pa
+            self._sink = pa.OSFile(path, "wb")
+            self._writer = None  # el esquema se fija con el primer lote
+        else:
+            self._pa = None
+            exists = append and os.path.exists(path) and os.path.getsize(path) > 0
+            self._file = open(path, "a" if append else "w", newline="")
+            self._csv = csv.writer(self._file)
+            if not exists:
+                self._csv.writerow(self.columns)
+                self._file.flush()
+
+    def write(self, row):
+        # row: dict con las columnas o secuencia en el orden de `columns`
+        if isinstance(row, dict):
+            row = [row[c] for c in self.columns]
+        self._rows.append(list(row))
+        if self.flush_every and len(self._rows) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        if not self._rows:
+            return
+        if self._pa is None:
+            self._csv.writerows(self._rows)
+            self._file.flush()
+        else:
+            batch = self._pa.RecordBatch.from_pydict(
+                {c: [row[i] for row in self._rows] for i, c in enumerate(self.columns)})
+            if self._writer is None:
+                self._writer = self._pa.ipc.new_stream(self._sink, batch.schema)
+            self._writer.write_batch(batch)
+            self._sink.flush()
+        self.rows_written += len(self._rows)
+        self._rows = []
+
+    def close(self):
+        self.flush()
+        if self._pa is None:
+            self._file.close()
+        else:
+            if self._writer is not None:
+                self._writer.close()
+            self._sink.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class StepAggregator:
+    # Resume los pasos de cada episodio en ventanas de `window` pasos (recompensa y cola media,
+    # mínima y máxima) y las escribe en su propio MetricsWriter
+    def __init__(self, writer, window=20):
+        self.writer = writer
+        self.window = window
+        self._reset(0, 0)
+
+    def _reset(self, episode, step):
+        self.episode = episode
+        self.start = step
+        self.count = 0
+        self.reward_sum = 0.0
+        self.reward_min = float("inf")
+        self.reward_max = float("-inf")
+        self.queue_sum = 0.0
+        self.queue_max = float("-inf")
+
+    def add(self, episode, step, reward, queue):
+        if episode != self.episode:
+            self.end_window()
+            self._reset(episode, step)
+        self.count += 1
+        self.reward_sum += reward
+        self.reward_min = min(self.reward_min, reward)
+        self.reward_max = max(self.reward_max, reward)
+        self.queue_sum += queue
+        self.queue_max = max(self.queue_max, queue)
+        if self.count == self.window:
+            self.end_window()
+            self._reset(episode, step + 1)
+
+    def end_window(self):
+        if self.count:
+            self.writer.write([self.episode, self.start, self.start + self.count - 1,
+                               self.reward_sum / self.count, self.reward_min, self.reward_max,
+                               self.queue_sum / self.count, self.queue_max])
+            self.count = 0
+
+    def flush(self):
+        # Cierra la ventana en curso y vuelca: llamar en un límite de episodio
+        self.end_window()
+        self.writer.flush()
+
+    def close(self):
+        self.end_window()
+        self.writer.close()
+
+
+def truncate_metrics(path, last_episode):
+    # Al reanudar desde un checkpoint: descarta las filas de episodios posteriores, que se
+    # volcaron después del checkpoint y se van a repetir. Solo CSV (Arrow no admite append).
+    if not os.path.exists(path):
+        return
+    with open(path, newline="") as f:
+        rows = list(csv.reader(f))
+    kept = rows[:1] + [row for row in rows[1:] if row and int(row[0]) <= last_episode]
+    with open(path + ".tmp", "w", newline="") as f:
+        csv.writer(f).writerows(kept)
+    os.replace(path + ".tmp", path)
+
+
+def read_metrics(path):
+    # DataFrame con las filas ya volcadas; vale también mientras el entrenamiento escribe
+    import pandas as pd
+    if _is_arrow(path):
+        import pyarrow as pa
+        with pa.OSFile(path, "rb") as source:
+            reader = pa.ipc.open_stream(source)
+            batches = []
+            try:
+                for batch in reader:
+                    batches.append(batch)
+            except pa.ArrowInvalid:
+                pass  # último lote aún a medio escribir
+        return pa.Table.from_batches(batches, reader.schema).to_pandas()
+    return pd.read_csv(path)
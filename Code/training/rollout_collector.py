@@ -0,0 +1,217 @@
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import queue
+import random
+
+import numpy as np
+
+from environment.intersection_env import IntersectionEnv
+
+NUM_AGENTS = 2
+ACTION_SIZE = 4
+SLOTS_PER_WORKER = 2  # doble buffer: el worker llena un slot mientras el learner consume el otro
+
+
+def split_state(full_state, agent_id, total_agents=2):
+    size = len(full_state) // total_agents
+    return full_state[agent_id * size:(agent_id + 1) * size]
+
+
+def _make_agents(agent_type, state_size, action_size, seed, dqn_config=None):
+    if agent_type == "q":
+        from agents.q_learning_agent import QLearningAgent
+        return (QLearningAgent(state_size, action_size, seed=seed + 1),
+                QLearningAgent(state_size, action_size, seed=seed + 2))
+    if agent_type == "dqn":
+        import torch
+        from agents.dqn_agent import DQNAgent
+        torch.set_num_threads(1)  # un hilo por worker, el paralelismo viene de los procesos
+        # Solo inferencia con los pesos difundidos: sin memoria de repetición ni optimizador
+        return (DQNAgent(state_size, action_size, seed=seed + 1, inference_only=True, **(dqn_config or {})),
+                DQNAgent(state_size, action_size, seed=seed + 2, inference_only=True, **(dqn_config or {})))
+    raise ValueError("Invalid agent type")
+
+
+def _check_alive(processes, role):
+    # Un proceso que terminó sin que se le pidiera parar se ha caído: error en vez de esperar
+    for k, p in enumerate(processes):
+        if not p.is_alive():
+            raise RuntimeError(f"{role} {k} exited unexpectedly (exit code {p.exitcode})")
+
+
+def _block_fields(max_steps, state_size):
+    return [
+        ("states", np.float32, (max_steps, state_size)),
+        ("actions", np.int64, (max_steps, NUM_AGENTS)),
+        ("rewards", np.float64, (max_steps,)),
+        ("next_states", np.float32, (max_steps, state_size)),
+        ("dones", np.bool_, (max_steps,)),
+    ]
+
+
+def _block_nbytes(max_steps, state_size):
+    total = 0
+    for _, dtype, shape in _block_fields(max_steps, state_size):
+        nbytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        total += (nbytes + 7) // 8 * 8
+    return total
+
+
+class TransitionBlock:
+    # Vistas NumPy sobre un slot de memoria compartida con las transiciones de un episodio
+    def __init__(self, buf, offset, max_steps, state_size):
+        self.num_steps = 0
+        for name, dtype, shape in _block_fields(max_steps, state_size):
+            count = int(np.prod(shape))
+            setattr(self, name, np.ndarray(shape, dtype=dtype, buffer=buf, offset=offset))
+            offset += (count * np.dtype(dtype).itemsize + 7) // 8 * 8
+
+
+def _run_episode(env, agentA, agentB, block):
+    full_state = env.reset()
+    total_reward = 0
+    queue_sum = 0
+    steps = 0
+    done = False
+
+    while not done:
+        stateA = split_state(full_state, 0)
+        stateB = split_state(full_state, 1)
+        actions = [agentA.get_action(stateA), agentB.get_action(stateB)]
+
+        next_state, reward, done, _ = env.step(actions)
+
+        block.states[steps] = full_state
+        block.actions[steps] = actions
+        block.rewards[steps] = reward
+        block.next_states[steps] = next_state
+        block.dones[steps] = done
+
+        full_state = next_state
+        total_reward += reward
+        queue_sum += np.mean(env.queues)
+        steps += 1
+
+    served, avg_wait = env.get_pedestrian_metrics()
+    return steps, total_reward, queue_sum / steps, served, avg_wait
+
+
+def _worker_loop(worker_id, agent_type, shm_name, commands, results, seed, dqn_config=None):
+    env = IntersectionEnv(seed=seed)
+    state_size = env.state_size
+    agentA, agentB = _make_agents(agent_type, state_size // NUM_AGENTS, ACTION_SIZE, seed, dqn_config)
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    nbytes = _block_nbytes(env.max_steps, state_size)
+    base = worker_id * SLOTS_PER_WORKER * nbytes
+    blocks = [TransitionBlock(shm.buf, base + slot * nbytes, env.max_steps, state_size)
+              for slot in range(SLOTS_PER_WORKER)]
+    try:
+        while True:
+            cmd, payload = commands.get()
+            if cmd == "stop":
+                break
+            if cmd == "weights":
+                agentA.set_weights(payload[0])
+                agentB.set_weights(payload[1])
+            elif cmd == "run":
+                metrics = _run_episode(env, agentA, agentB, blocks[payload])
+                results.put((worker_id, payload, metrics))
+    finally:
+        del blocks
+        shm.close()
+
+
+class RolloutCollector:
+    # K procesos generan episodios con una copia de solo lectura de la política; las
+    # transiciones vuelven por memoria compartida y el proceso principal hace el aprendizaje.
+    def __init__(self, agent_type, num_workers, sync_every=5, seed=None, dqn_config=None):
+        self.agent_type = agent_type
+        self.num_workers = num_workers
+        self.sync_every = sync_every
+
+        probe = IntersectionEnv()
+        self.max_steps = probe.max_steps
+        self.state_size = probe.state_size
+
+        nbytes = _block_nbytes(self.max_steps, self.state_size)
+        self._shm = shared_memory.SharedMemory(create=True, size=num_workers * SLOTS_PER_WORKER * nbytes)
+        self._blocks = [
+            [TransitionBlock(self._shm.buf, (w * SLOTS_PER_WORKER + slot) * nbytes, self.max_steps, self.state_size)
+             for slot in range(SLOTS_PER_WORKER)]
+            for w in range(num_workers)
+        ]
+
+        if seed is None:
+            seed = random.randrange(2**31)
+        # Cada worker usa seed + 3 * w para el entorno y los dos siguientes para sus agentes
+        ctx = mp.get_context("spawn")
+        self._results = ctx.Queue()
+        self._commands = [ctx.Queue() for _ in range(num_workers)]
+        self._workers = [
+            ctx.Process(target=_worker_loop,
+                        args=(w, agent_type, self._shm.name, self._commands[w], self._results, seed + 3 * w,
+                              dqn_config),
+                        daemon=True)
+            for w in range(num_workers)
+        ]
+        for p in self._workers:
+            p.start()
+
+    def broadcast(self, agentA, agentB):
+        weights = (agentA.get_weights(), agentB.get_weights())
+        for q in self._commands:
+            q.put(("weights", weights))
+
+    def episodes(self, agentA, agentB, num_episodes):
+        # Genera (TransitionBlock, métricas) por episodio terminado. El bloque solo es válido
+        # hasta pedir el siguiente episodio.
+        self.broadcast(agentA, agentB)
+        dispatched = 0
+        for slot in range(SLOTS_PER_WORKER):
+            for w in range(self.num_workers):
+                if dispatched < num_episodes:
+                    self._commands[w].put(("run", slot))
+                    dispatched += 1
+
+        completed = 0
+        while completed < num_episodes:
+            worker_id, slot, metrics = self._next_result()
+            block = self._blocks[worker_id][slot]
+            block.num_steps = metrics[0]
+            yield block, metrics[1:]
+            completed += 1
+
+            if completed % self.sync_every == 0:
+                self.broadcast(agentA, agentB)
+            if dispatched < num_episodes:
+                self._commands[worker_id].put(("run", slot))
+                dispatched += 1
+
+    def _next_result(self):
+        # Espera el siguiente episodio comprobando cada segundo que ningún worker se haya caído
+        while True:
+            try:
+                return self._results.get(timeout=1.0)
+            except queue.Empty:
+                _check_alive(self._workers, "Rollout worker")
+
+    def close(self):
+        for q in self._commands:
+            q.put(("stop", None))
+        for p in self._workers:
+            p.join(timeout=5)
+            if p.is_alive():
+                p.terminate()
+        self._blocks = None
+        try:
+            self._shm.close()
+        except BufferError:
+            pass  # aún quedan vistas vivas del lado del learner; el segmento se libera igual
+        self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()